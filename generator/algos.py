@@ -24,25 +24,137 @@ def get_distance(p1, p2):
         dist_cache[f'{p1.toTuple()}, {p2.toTuple()}'] = None
         return None
 
+# Trying every order takes k! steps for k passengers, which is still cheap up to this
+# many passengers. Past it, sort_path switches to the O(k^2 * 2^k) dynamic program.
+BRUTE_FORCE_LIMIT = 6
+
+def get_leg_distances(src, passengers):
+    """
+    Returns a function giving the distance of the leg between two of the points of a
+    scheduling problem, where index 0 is src and index i + 1 is the destination of
+    passengers[i]. Unreachable legs are math.inf. Each leg is only computed on first use.
+    """
+    points = [src] + [p.dest for p in passengers]
+    legs = {}
+
+    # every leg is usually needed, so the ones missing from the caches are asked from
+    # OSRM together rather than one at a time as the search reaches them. get_distance
+    # answers both directions of a pair from whichever one it cached first, so each
+    # pair is only asked for once
+    util.prefetch_paths_in_osrm([
+        (points[i].toTuple(), points[j].toTuple())
+        for i in range(len(points)) for j in range(i + 1, len(points))
+        if not dist_cache.get(f'{points[i].toTuple()}, {points[j].toTuple()}')
+        and not dist_cache.get(f'{points[j].toTuple()}, {points[i].toTuple()}')
+    ])
+
+    def leg_distance(i, j):
+        if (i, j) not in legs:
+            path_to_passenger_raw = get_distance(points[i], points[j])
+            if path_to_passenger_raw is None:
+                legs[(i, j)] = math.inf
+            else:
+                legs[(i, j)] = Path(*path_to_passenger_raw + [points[j].toTuple()]).getDistance()
+        return legs[(i, j)]
+
+    return leg_distance
+
+# Drop-off orders already worked out, keyed on the coordinates of the scheduling problem.
+# A tricycle asks for a schedule again on every frame it does not move, from the same
+# spot and with the same passengers, so most calls in a run are repeats.
+# Only the current run's problems are worth keeping, so the cache starts over when full.
+SCHEDULE_CACHE_SIZE = 10_000
+schedule_cache = {}
+
+def sort_path(src, passengers):
+    "Returns the same as sort_path_brute, using whichever algorithm is faster for the number of passengers"
+    key = (src.x, src.y, tuple((p.dest.x, p.dest.y) for p in passengers))
+    if key in schedule_cache:
+        order = schedule_cache[key]
+        if order is None:
+            return None, 0
+        return [passengers[i] for i in order], order[0]
+
+    if len(passengers) <= BRUTE_FORCE_LIMIT:
+        best_order, start_index = sort_path_brute(src, passengers)
+    else:
+        best_order, start_index = sort_path_dp(src, passengers)
+
+    if len(schedule_cache) >= SCHEDULE_CACHE_SIZE:
+        schedule_cache.clear()
+    if best_order is None:
+        schedule_cache[key] = None
+    else:
+        indices = {id(p): i for i, p in enumerate(passengers)}
+        schedule_cache[key] = tuple(indices[id(p)] for p in best_order)
+    return best_order, start_index
+
 def sort_path_brute(src, passengers):
-    with_index = zip(range(len(passengers)), passengers)
+    """
+    Returns the order of dropping off the passengers that covers the least distance
+    from src, and the index of the first passenger in that order. Every order is tried,
+    but the distance of each leg is only computed once and then reused by every order
+    that contains it.
+    """
+    leg_distance = get_leg_distances(src, passengers)
+
     least_distance = math.inf
     best_order = None
     start_index = 0
-    for order in permutations(with_index):
+    for order in permutations(range(len(passengers))):
         total_distance = 0
-        cur_point = src
-        for index, p in order:
-            dst_point = p.dest
-            path_to_passenger_raw = get_distance(cur_point, dst_point)
-            if path_to_passenger_raw is None:
+        cur = 0
+        for index in order:
+            distance = leg_distance(cur, index + 1)
+            if distance == math.inf:
                 total_distance = math.inf
                 break
-            path_to_passenger = Path(*path_to_passenger_raw + [dst_point.toTuple()])
-            total_distance += path_to_passenger.getDistance()
-            cur_point = p.dest
+            total_distance += distance
+            cur = index + 1
         if total_distance < least_distance:
             least_distance = total_distance
-            best_order = [p for i,p in order]
-            start_index = order[0][0]
-    return best_order, start_index
\ No newline at end of file
+            best_order = [passengers[i] for i in order]
+            start_index = order[0]
+    return best_order, start_index
+
+def sort_path_dp(src, passengers):
+    """
+    Returns the same as sort_path_brute using the Held-Karp dynamic program: best[mask][last]
+    is the shortest distance from src that drops off the passengers in mask and ends with
+    passengers[last]. When several orders are equally short, the one picked may differ
+    from the one sort_path_brute picks.
+    """
+    leg_distance = get_leg_distances(src, passengers)
+    k = len(passengers)
+    full = (1 << k) - 1
+
+    best = [[math.inf] * k for _ in range(full + 1)]
+    previous = [[-1] * k for _ in range(full + 1)]
+    for j in range(k):
+        best[1 << j][j] = leg_distance(0, j + 1)
+
+    for mask in range(1, full + 1):
+        for last in range(k):
+            distance = best[mask][last]
+            if distance == math.inf or not mask & (1 << last):
+                continue
+            for j in range(k):
+                if mask & (1 << j):
+                    continue
+                total_distance = distance + leg_distance(last + 1, j + 1)
+                if total_distance < best[mask | (1 << j)][j]:
+                    best[mask | (1 << j)][j] = total_distance
+                    previous[mask | (1 << j)][j] = last
+
+    last = min(range(k), key=lambda j: best[full][j])
+    if best[full][last] == math.inf:
+        return None, 0
+
+    # walk back from the last passenger to recover the order
+    order = []
+    mask = full
+    while last != -1:
+        order.append(last)
+        mask, last = mask & ~(1 << last), previous[mask][last]
+    order.reverse()
+    return [passengers[i] for i in order], order[0]
@@ -0,0 +1,51 @@
+import os
+import json
+
+DATA_DIR = os.path.join('data', 'real')
+
+def consolidate_run(run_dir):
+    """
+    Writes trikes.json and passengers.json for a run that only has the per-entity
+    trike_i.json/passenger_i.json files. Returns False if there was nothing to do.
+    """
+    trikes_path = os.path.join(run_dir, 'trikes.json')
+    passengers_path = os.path.join(run_dir, 'passengers.json')
+    metadata_path = os.path.join(run_dir, 'metadata.json')
+    if os.path.exists(trikes_path) and os.path.exists(passengers_path):
+        return False
+    if not os.path.exists(metadata_path):
+        return False
+
+    with open(metadata_path) as f:
+        metadata = json.load(f)
+
+    for prefix, total_key, out_path in (
+        ('trike', 'totalTrikes', trikes_path),
+        ('passenger', 'totalPassengers', passengers_path)
+    ):
+        entities = []
+        for i in range(metadata[total_key]):
+            with open(os.path.join(run_dir, f'{prefix}_{i}.json')) as f:
+                entities.append(json.load(f))
+        with open(out_path, 'w+') as f:
+            json.dump(entities, f)
+
+    return True
+
+def main():
+    """One-time migration of existing runs in data/real to the single-file layout"""
+    migrated = 0
+    for case in sorted(os.listdir(DATA_DIR)):
+        run_dir = os.path.join(DATA_DIR, case)
+        if not os.path.isdir(run_dir):
+            continue
+        try:
+            if consolidate_run(run_dir):
+                migrated += 1
+        except Exception as e:
+            print(f"Skipping {case}: {e}")
+
+    print(f"Consolidated {migrated} runs")
+
+if __name__ == '__main__':
+    main()
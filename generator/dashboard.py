@@ -1,12 +1,26 @@
 import os
-import json
+import glob
+import pickle
+import hashlib
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    import json
 import math
-import scipy
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
-import seaborn as sns
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+IO_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+def read_json(path):
+    # orjson parses bytes directly, so skip the text-mode decode
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r') as f:
+        return json.load(f)
 
 class SimulationRun:
     def __init__(self, name):
@@ -17,8 +31,7 @@ class SimulationRun:
         self.numPassengers = int(numPassengers)
         self.seed = seed
 
-        with open(os.path.join('data', 'real', self.name, 'metadata.json')) as f:
-            self.metadata = json.load(f)
+        self.metadata = read_json(os.path.join('data', 'real', self.name, 'metadata.json'))
         
         # validate if metadata is updated
         if 'isRealistic' not in self.metadata:
@@ -30,220 +43,332 @@ class SimulationRun:
         
         self.trikeCapacity = self.metadata['trikeConfig'].get('capacity', 3)
         self.useSmartScheduler = self.metadata.get('smartScheduling', True)
-
-        self.trikes = []
-        for i in range(self.numTrikes):
-            with open(os.path.join('data', 'real', self.name, f'trike_{i}.json')) as f:
-                data = json.load(f)
-                # st.write(data)
-                trike = {
-                    "totalDistance": data["totalDistance"],
-                    "productiveDistance": data["productiveDistance"],
-                    "waitingTimeSeconds": max(0, data["waitingTime"]),
-                    "speed": data["speed"],
-                    "productiveTravelTimeSeconds": data["totalProductiveDistanceM"]/data["speed"],
-                    "unproductiveTravelTimeSeconds": (data["totalDistance"]-data["productiveDistance"])/data["speed"]
-                }
-                trike["totalTimeSeconds"] = trike["waitingTimeSeconds"] + trike["productiveTravelTimeSeconds"] + trike["unproductiveTravelTimeSeconds"]
-                self.trikes.append(trike)
+        self.loaded = False
+
+    def load_entities(self):
+        """
+        Loads the tricycles and passengers of the run along with their averages.
+        This is the expensive part of a run, so it is only done for the runs that
+        are plotted or viewed.
+        """
+        if self.loaded:
+            return
+
+        trikes_path = os.path.join('data', 'real', self.name, 'trikes.json')
+        passengers_path = os.path.join('data', 'real', self.name, 'passengers.json')
+        if os.path.exists(trikes_path) and os.path.exists(passengers_path):
+            raw_trikes = read_json(trikes_path)
+            raw_passengers = read_json(passengers_path)
+        else:
+            # older runs only have the per-entity files, so list them in one directory
+            # scan and read the ones that exist concurrently, since they are small and many
+            run_dir = os.path.join('data', 'real', self.name)
+            with os.scandir(run_dir) as it:
+                names = [entry.name for entry in it if entry.name.endswith('.json')]
+            trike_paths = [os.path.join(run_dir, n) for n in sorted((n for n in names if n.startswith('trike_')), key=lambda n: int(n[6:-5]))]
+            passenger_paths = [os.path.join(run_dir, n) for n in sorted((n for n in names if n.startswith('passenger_')), key=lambda n: int(n[10:-5]))]
+            with ThreadPoolExecutor(max_workers=8) as ex:
+                raw_trikes = list(ex.map(read_json, trike_paths))
+                raw_passengers = list(ex.map(read_json, passenger_paths))
+
+        # derive the time split of every tricycle in one batch of array operations
+        speed = np.array([data["speed"] for data in raw_trikes], dtype=np.float64)
+        total_distance = np.array([data["totalDistance"] for data in raw_trikes], dtype=np.float64)
+        productive_distance = np.array([data["productiveDistance"] for data in raw_trikes], dtype=np.float64)
+        productive_distance_m = np.array([data["totalProductiveDistanceM"] for data in raw_trikes], dtype=np.float64)
+        waiting_time = np.maximum(0, np.array([data["waitingTime"] for data in raw_trikes], dtype=np.float64))
+        self.trike_prod = productive_distance_m/speed
+        self.trike_unprod = (total_distance-productive_distance)/speed
+        self.trike_total = waiting_time + self.trike_prod + self.trike_unprod
+
+        self.trikes = [
+            {
+                "totalDistance": data["totalDistance"],
+                "productiveDistance": data["productiveDistance"],
+                "waitingTimeSeconds": waiting,
+                "speed": data["speed"],
+                "productiveTravelTimeSeconds": productive,
+                "unproductiveTravelTimeSeconds": unproductive,
+                "totalTimeSeconds": total
+            }
+            for data, waiting, productive, unproductive, total in zip(
+                raw_trikes, waiting_time.tolist(), self.trike_prod.tolist(), self.trike_unprod.tolist(), self.trike_total.tolist()
+            )
+        ]
 
         self.passengers = []
-        for i in range(self.numPassengers):
-            with open(os.path.join('data', 'real', self.name, f'passenger_{i}.json')) as f:
-                data = json.load(f)
-                if data["offloadTime"] == -1:
-                    continue
-                passenger = {
-                    "waitingTime": data["deathTime"]-data["createTime"],
-                    "travelingTime": data["offloadTime"]-data["deathTime"],
-                    "waitingTimeSeconds": (data["deathTime"]-data["createTime"]),
-                    "travelingTimeSeconds": (data["offloadTime"]-data["deathTime"])
-                }
-                self.passengers.append(passenger)
+        for data in raw_passengers:
+            if data["offloadTime"] == -1:
+                continue
+            passenger = {
+                "waitingTime": data["deathTime"]-data["createTime"],
+                "travelingTime": data["offloadTime"]-data["deathTime"],
+                "waitingTimeSeconds": (data["deathTime"]-data["createTime"]),
+                "travelingTimeSeconds": (data["offloadTime"]-data["deathTime"])
+            }
+            self.passengers.append(passenger)
+
+        # struct-of-arrays copies of the passenger fields the figures aggregate over
+        self.p_wait = np.fromiter((x["waitingTimeSeconds"] for x in self.passengers), dtype=np.float64, count=len(self.passengers))
+        self.p_travel = np.fromiter((x["travelingTimeSeconds"] for x in self.passengers), dtype=np.float64, count=len(self.passengers))
+
+        # per-simulation averages, computed once here since every figure reuses them
+        if len(self.passengers) == 0 or len(self.trikes) == 0:
+            raise Exception("No finished trips")
+        self.avg_passenger_wait = self.p_wait.mean()
+        self.avg_passenger_travel = self.p_travel.mean()
+        # tricycles with no time on the clock are left out, as in the simulator's metadata
+        has_time = self.trike_total > 0
+        self.avg_trike_productive_ratio = (self.trike_prod[has_time]/self.trike_total[has_time]).mean()
+        self.loaded = True
 
     def __str__(self):
         return f'<{self.seed} | Trikes: {self.numTrikes}, Terminals: {self.numTerminals}, Passengers: {self.numPassengers}>'
 
+def plot_reg(ax, x, y, label=None, logx=False):
+    """
+    Scatter plot of x and y with its linear trend line (fit against log(x) when
+    logx is set). Returns the trend values at the smallest and largest x, or NaNs
+    when there are fewer than 2 distinct x values to fit a line through.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    points = ax.scatter(x, y, label=label)
+
+    if len(np.unique(x)) < 2:
+        return math.nan, math.nan
+
+    slope, intercept = np.polyfit(np.log(x) if logx else x, y, 1)
+    xr = np.linspace(x.min(), x.max(), 100)
+    yr = intercept + slope * (np.log(xr) if logx else xr)
+    ax.plot(xr, yr, color=points.get_facecolor()[0])
+    return yr[0], yr[-1]
+
 st.header("Simulation Analysis")
 
-simulations: list[SimulationRun] = []
-for case in os.listdir(os.path.join('data', 'real')):
-    try:
-        simulation = SimulationRun(case)
-        simulations.append(simulation)
-        # st.write(case)
-    except Exception as e:
-        # st.exception(e)
-        pass
+def load_simulation(case):
+    simulation = SimulationRun(case)
+    # only the 100-passenger runs are plotted, the rest load when they are viewed
+    if simulation.numPassengers == 100:
+        simulation.load_entities()
+    return simulation
+
+def load_simulations():
+    simulations: list[SimulationRun] = []
+    with ThreadPoolExecutor(max_workers=IO_WORKERS) as ex:
+        futures = {ex.submit(load_simulation, case): case for case in os.listdir(os.path.join('data', 'real')) if not case.startswith('.')}
+        for future in as_completed(futures):
+            try:
+                simulation = future.result()
+                simulations.append(simulation)
+                # st.write(futures[future])
+            except Exception as e:
+                # st.exception(e)
+                pass
+    return simulations
+
+def simulation_cache_path():
+    """
+    Path of the pickled simulations for the current state of data/real. The key
+    changes whenever a run's metadata is added, removed or rewritten.
+    """
+    metadata_paths = sorted(glob.glob(os.path.join('data', 'real', '*', 'metadata.json')))
+    key = hashlib.sha1(b''.join(f'{p}:{os.stat(p).st_mtime_ns}'.encode() for p in metadata_paths)).hexdigest()
+    return os.path.join('data', f'cache_{key}.pkl')
+
+cache_path = simulation_cache_path()
+if os.path.exists(cache_path):
+    with open(cache_path, 'rb') as f:
+        simulations = pickle.load(f)
+else:
+    simulations = load_simulations()
+    # drop caches of older states of the data before writing the new one
+    for stale in glob.glob(os.path.join('data', 'cache_*.pkl')):
+        os.remove(stale)
+    with open(cache_path, 'wb') as f:
+        pickle.dump(simulations, f, protocol=5)
 
 simulations = sorted(simulations, key=lambda x: (x.numTrikes, x.numPassengers, x.name), reverse=True)
 
+if not simulations:
+    st.warning("No valid simulations found in data/real")
+    st.stop()
+
+# the plotting stack is only needed once there is something to plot
+import pandas as pd
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+# the figures are simple scatter/line plots, so let Agg simplify paths aggressively
+plt.rcParams['path.simplify_threshold'] = 1.0
+
+# one row of aggregates per simulation, so the figures below filter and group
+# a single table instead of re-scanning the simulation list
+loaded_simulations = [x for x in simulations if x.loaded]
+summary_df = pd.DataFrame({
+    'numTrikes': [x.numTrikes for x in loaded_simulations],
+    'numPassengers': [x.numPassengers for x in loaded_simulations],
+    'capacity': [x.trikeCapacity for x in loaded_simulations],
+    'smart': [x.useSmartScheduler for x in loaded_simulations],
+    'wait': [x.avg_passenger_wait for x in loaded_simulations],
+    'travel': [x.avg_passenger_travel for x in loaded_simulations],
+    'prod': [x.avg_trike_productive_ratio for x in loaded_simulations],
+})
+
+def bucket_means(df, by, keys):
+    """Mean of every metric per value of the by column, NaN for keys without runs."""
+    metrics = ['wait', 'travel', 'prod']
+    # one (runs x keys) membership mask turns every per-key mean into a single matrix product
+    match = df[by].to_numpy()[:, None] == np.asarray(keys)[None, :]
+    counts = match.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = (match.T @ df[metrics].to_numpy(dtype=np.float64)) / counts[:, None]
+    return pd.DataFrame(means, index=keys, columns=metrics)
+
+# every figure only looks at the 100-passenger runs, so split those once up front
+full_runs = summary_df[summary_df.numPassengers == 100]
+naive_runs = full_runs[~full_runs.smart]
+smart_runs = full_runs[full_runs.smart]
+
+# all summary figures share the same size, so draw them one after another on a
+# single figure instead of allocating a new one each time
+fig, ax = plt.subplots(figsize=(10, 6), layout='tight')
+
 st.header("Summary")
 
 # scatter plot for overall progressions
-valid_simulations = list(filter(lambda x : x.useSmartScheduler and x.trikeCapacity == 3 and x.numPassengers == 100, simulations))
-x_values = [x.numTrikes for x in valid_simulations]
-y_values_trike_productive = [sum([x["productiveTravelTimeSeconds"]/x["totalTimeSeconds"] for x in y.trikes])/len(y.trikes) for y in valid_simulations]
-y_values_pass_wait = [sum([x["waitingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations]
-y_values_pass_travel = [sum([x["travelingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations]
-
-# plt.scatter(x_values, y_values_trike_productive)
-fig, axs0 = plt.subplots(nrows=1)
-p = sns.regplot(x='x', y='y', data=pd.DataFrame({'x': x_values, 'y': y_values_pass_wait}), ci=None, ax=axs0, logx=True)
-values_left = [sum([x["waitingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations if y.numTrikes == 3]
-values_right = [sum([x["waitingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations if y.numTrikes == 15]
-values_left_1 = [sum([x["waitingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations if y.numTrikes == 6]
-values_right_1 = [sum([x["waitingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations if y.numTrikes == 12]
-st.write(f'Average: {sum(values_left)/(60*len(values_left))}, {sum(values_right)/(60*len(values_right))}')
-st.write(f'Average: {sum(values_left_1)/(60*len(values_left))}, {sum(values_right_1)/(60*len(values_right))}')
-st.write(f'Trend: {p.get_lines()[0].get_ydata()[0]/60}, {p.get_lines()[0].get_ydata()[-1]/60}')
+valid = smart_runs[smart_runs.capacity == 3]
+means = bucket_means(valid, 'numTrikes', [3, 6, 12, 15])
+
+ax.clear()
+trend = plot_reg(ax, valid['numTrikes'], valid['wait'], logx=True)
+st.write(f'Average: {means.wait[3]/60}, {means.wait[15]/60}')
+st.write(f'Average: {means.wait[6]/60}, {means.wait[12]/60}')
+st.write(f'Trend: {trend[0]/60}, {trend[1]/60}')
 
 # slope, intercept, r, p, sterr = scipy.stats.linregress(x=p.get_lines()[0].get_xdata(),
 #                                                        y=p.get_lines()[0].get_ydata())
-# axs[0].scatter(x_values, y_values_pass_wait, label="Ave Passenger Waiting Time")
 
-axs0.set_xlabel("Number of Tricycles")
-axs0.set_ylabel("Average Passenger Waiting Time (s)")
-axs0.set_title("Relationship between the number of tricycles and average passenger waiting time")
-axs0.legend()
-axs0.grid(True)
+ax.set_xlabel("Number of Tricycles")
+ax.set_ylabel("Average Passenger Waiting Time (s)")
+ax.set_title("Relationship between the number of tricycles and average passenger waiting time")
+ax.legend()
+ax.grid(True)
 
 st.pyplot(fig)
-plt.savefig('figures/fig1.png', bbox_inches='tight')
-
-fig, axs1 = plt.subplots(nrows=1)
-p = sns.regplot(x='x', y='y', data=pd.DataFrame({'x': x_values, 'y': y_values_pass_travel}), ci=None, ax=axs1)
-values_left = [sum([x["travelingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations if y.numTrikes == 3]
-values_right = [sum([x["travelingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations if y.numTrikes == 15]
-st.write(f'Average: {sum(values_left)/(60*len(values_left))}, {sum(values_right)/(60*len(values_right))}')
-st.write(f'Trend: {p.get_lines()[0].get_ydata()[0]/60}, {p.get_lines()[0].get_ydata()[-1]/60}')
-# axs[1].scatter(x_values, y_values_pass_travel, label="Ave Passenger Traveling Time")
-
-axs1.set_xlabel("Number of Tricycles")
-axs1.set_ylabel("Average Passenger Traveling Time (s)")
-axs1.set_title("Relationship between the number of tricycles and average passenger traveling time")
-axs1.legend()
-axs1.grid(True)
+fig.savefig('figures/fig1.png')
+
+ax.clear()
+trend = plot_reg(ax, valid['numTrikes'], valid['travel'])
+st.write(f'Average: {means.travel[3]/60}, {means.travel[15]/60}')
+st.write(f'Trend: {trend[0]/60}, {trend[1]/60}')
+
+ax.set_xlabel("Number of Tricycles")
+ax.set_ylabel("Average Passenger Traveling Time (s)")
+ax.set_title("Relationship between the number of tricycles and average passenger traveling time")
+ax.legend()
+ax.grid(True)
 
 st.pyplot(fig)
-plt.savefig('figures/fig2.png', bbox_inches='tight')
-
-fig, axs2 = plt.subplots(nrows=1)
-p = sns.regplot(x='x', y='y', data=pd.DataFrame({'x': x_values, 'y': y_values_trike_productive}), ci=None, ax=axs2)
-values_left = [sum([x["productiveTravelTimeSeconds"]/x["totalTimeSeconds"] for x in y.trikes])/len(y.trikes) for y in valid_simulations if y.numTrikes == 3]
-values_right = [sum([x["productiveTravelTimeSeconds"]/x["totalTimeSeconds"] for x in y.trikes])/len(y.trikes) for y in valid_simulations if y.numTrikes == 15]
-st.write(f'Average: {sum(values_left)/(len(values_left))}, {sum(values_right)/(len(values_right))}')
-st.write(f'Trend: {p.get_lines()[0].get_ydata()[0]}, {p.get_lines()[0].get_ydata()[-1]}')
-# axs[2].scatter(x_values, y_values_trike_productive, label="Ave Tricycle Productive Time")
-axs2.set_xlabel("Number of Tricycles")
-axs2.set_ylabel("Average Tricycles Productive Time (%)")
-axs2.set_title("Relationship between the number of tricycles and average tricycle productive time")
-axs2.legend()
-axs2.grid(True)
+fig.savefig('figures/fig2.png')
+
+ax.clear()
+trend = plot_reg(ax, valid['numTrikes'], valid['prod'])
+st.write(f'Average: {means["prod"][3]}, {means["prod"][15]}')
+st.write(f'Trend: {trend[0]}, {trend[1]}')
+
+ax.set_xlabel("Number of Tricycles")
+ax.set_ylabel("Average Tricycles Productive Time (%)")
+ax.set_title("Relationship between the number of tricycles and average tricycle productive time")
+ax.legend()
+ax.grid(True)
 
 st.pyplot(fig)
-plt.savefig('figures/fig3.png', bbox_inches='tight')
+fig.savefig('figures/fig3.png')
 
 st.header("Scheduling")
-valid_simulations = list(filter(lambda x: x.numPassengers == 100 and x.trikeCapacity == 3, simulations))
-x_values_naive = [x.numTrikes for x in valid_simulations if not x.useSmartScheduler]
-x_values_smart = [x.numTrikes for x in valid_simulations if x.useSmartScheduler]
-y_values_pass_naive = [sum([x["travelingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations if not y.useSmartScheduler]
-y_values_pass_smart = [sum([x["travelingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations if y.useSmartScheduler]
-
-# plt.scatter(x_values, y_values_trike_productive)
-figSched, axsSched = plt.subplots(nrows=1)
-p = sns.regplot(x='x', y='y', data=pd.DataFrame({'x': x_values_naive, 'y': y_values_pass_naive}), ci=None, ax=axsSched, label="FIFO")
-values_left = [sum([x["travelingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations if y.numTrikes == 3 and not y.useSmartScheduler]
-values_right = [sum([x["travelingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations if y.numTrikes == 15 and not y.useSmartScheduler]
-st.write(f'Average: {sum(values_left)/(60*len(values_left))}, {sum(values_right)/(60*len(values_right))}')
-st.write(f'Trend: {p.get_lines()[0].get_ydata()[0]/60}, {p.get_lines()[0].get_ydata()[-1]/60}')
-p = sns.regplot(x='x', y='y', data=pd.DataFrame({'x': x_values_smart, 'y': y_values_pass_smart}), ci=None, ax=axsSched, label="Optimized Scheduling")
-values_left = [sum([x["travelingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations if y.numTrikes == 3 and y.useSmartScheduler]
-values_right = [sum([x["travelingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations if y.numTrikes == 15 and y.useSmartScheduler]
-st.write(f'Average: {sum(values_left)/(60*len(values_left))}, {sum(values_right)/(60*len(values_right))}')
-st.write(f'Trend: {p.get_lines()[0].get_ydata()[0]/60}, {p.get_lines()[0].get_ydata()[-1]/60}')
-# axsSched.scatter(x_values_naive, y_values_pass_naive, label="Naive Scheduling")
-# axsSched.scatter(x_values_smart, y_values_pass_smart, label="Optimized Scheduling")
-
-axsSched.set_xlabel("Number of Tricycles")
-axsSched.set_ylabel("Average Passenger Traveling Time (s)")
-axsSched.set_title("Effect of using Optimized Scheduling on Average Passenger Traveling Time")
-axsSched.legend()
-axsSched.grid(True)
-
-st.pyplot(figSched)
-plt.savefig('figures/fig4.png', bbox_inches='tight')
+naive = naive_runs[naive_runs.capacity == 3]
+smart = smart_runs[smart_runs.capacity == 3]
+
+ax.clear()
+for label, group in (("FIFO", naive), ("Optimized Scheduling", smart)):
+    trend = plot_reg(ax, group['numTrikes'], group['travel'], label=label)
+    means = bucket_means(group, 'numTrikes', [3, 15])
+    st.write(f'Average: {means.travel[3]/60}, {means.travel[15]/60}')
+    st.write(f'Trend: {trend[0]/60}, {trend[1]/60}')
+
+ax.set_xlabel("Number of Tricycles")
+ax.set_ylabel("Average Passenger Traveling Time (s)")
+ax.set_title("Effect of using Optimized Scheduling on Average Passenger Traveling Time")
+ax.legend()
+ax.grid(True)
+
+st.pyplot(fig)
+fig.savefig('figures/fig4.png')
 
 st.header("Trike Capacity")
-valid_simulations = list(filter(lambda x: x.numPassengers == 100 and x.useSmartScheduler, simulations))
-x_values = [x.trikeCapacity for x in valid_simulations]
-y_values_trike_productive = [sum([x["productiveTravelTimeSeconds"]/x["totalTimeSeconds"] for x in y.trikes])/len(y.trikes) for y in valid_simulations]
-y_values_pass_wait = [sum([x["waitingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations]
-y_values_pass_travel = [sum([x["travelingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations]
-
-# plt.scatter(x_values, y_values_trike_productive)
-fig, axs0 = plt.subplots()
-p = sns.regplot(x='x', y='y', data=pd.DataFrame({'x': x_values, 'y': y_values_pass_wait}), ci=None, ax=axs0)
-values_left = [sum([x["waitingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations if y.trikeCapacity == 3]
-values_right = [sum([x["waitingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations if y.trikeCapacity == 6]
-st.write(f'Average: {sum(values_left)/(60*len(values_left))}, {sum(values_right)/(60*len(values_right))}')
-st.write(f'Trend: {p.get_lines()[0].get_ydata()[0]/60}, {p.get_lines()[0].get_ydata()[-1]/60}')
-# axs[0].scatter(x_values, y_values_pass_wait, label="Ave Passenger Waiting Time")
-
-axs0.set_xlabel("Tricycle Capacity (number of passengers)")
-axs0.set_ylabel("Average Passenger Waiting Time (s)")
-axs0.set_title("Relationship between tricycle capacity and average passenger waiting time")
-axs0.legend()
-axs0.grid(True)
+valid = smart_runs
+means = bucket_means(valid, 'capacity', [3, 6])
+
+ax.clear()
+trend = plot_reg(ax, valid['capacity'], valid['wait'])
+st.write(f'Average: {means.wait[3]/60}, {means.wait[6]/60}')
+st.write(f'Trend: {trend[0]/60}, {trend[1]/60}')
+
+ax.set_xlabel("Tricycle Capacity (number of passengers)")
+ax.set_ylabel("Average Passenger Waiting Time (s)")
+ax.set_title("Relationship between tricycle capacity and average passenger waiting time")
+ax.legend()
+ax.grid(True)
 
 st.pyplot(fig)
-plt.savefig('figures/fig5.png', bbox_inches='tight')
-
-fig, axs1 = plt.subplots()
-p = sns.regplot(x='x', y='y', data=pd.DataFrame({'x': x_values, 'y': y_values_pass_travel}), ci=None, ax=axs1)
-values_left = [sum([x["travelingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations if y.trikeCapacity == 3]
-values_right = [sum([x["travelingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations if y.trikeCapacity == 6]
-st.write(f'Average: {sum(values_left)/(60*len(values_left))}, {sum(values_right)/(60*len(values_right))}')
-st.write(f'Trend: {p.get_lines()[0].get_ydata()[0]/60}, {p.get_lines()[0].get_ydata()[-1]/60}')
-# axs[1].scatter(x_values, y_values_pass_travel, label="Ave Passenger Traveling Time")
-
-axs1.set_xlabel("Tricycle Capacity (number of passengers)")
-axs1.set_ylabel("Average Passenger Traveling Time (s)")
-axs1.set_title("Relationship between tricycle capacity and average passenger waiting time")
-axs1.legend()
-axs1.grid(True)
+fig.savefig('figures/fig5.png')
+
+ax.clear()
+trend = plot_reg(ax, valid['capacity'], valid['travel'])
+st.write(f'Average: {means.travel[3]/60}, {means.travel[6]/60}')
+st.write(f'Trend: {trend[0]/60}, {trend[1]/60}')
+
+ax.set_xlabel("Tricycle Capacity (number of passengers)")
+ax.set_ylabel("Average Passenger Traveling Time (s)")
+ax.set_title("Relationship between tricycle capacity and average passenger waiting time")
+ax.legend()
+ax.grid(True)
 
 st.pyplot(fig)
-plt.savefig('figures/fig6.png', bbox_inches='tight')
-
-fig, axs2 = plt.subplots()
-p = sns.regplot(x='x', y='y', data=pd.DataFrame({'x': x_values, 'y': y_values_trike_productive}), ci=None, ax=axs2)
-values_left = [sum([x["productiveTravelTimeSeconds"]/x["totalTimeSeconds"] for x in y.trikes])/len(y.trikes) for y in valid_simulations if y.numTrikes == 3]
-values_right = [sum([x["productiveTravelTimeSeconds"]/x["totalTimeSeconds"] for x in y.trikes])/len(y.trikes) for y in valid_simulations if y.numTrikes == 15]
-st.write(f'Average: {sum(values_left)/(len(values_left))}, {sum(values_right)/(len(values_right))}')
-st.write(f'Trend: {p.get_lines()[0].get_ydata()[0]}, {p.get_lines()[0].get_ydata()[-1]}')
-# axs[2].scatter(x_values, y_values_trike_productive, label="Ave Tricycle Productive Time")
-
-axs2.set_xlabel("Tricycle Capacity (number of passengers)")
-axs2.set_ylabel("Average Tricycle Productive Time (%)")
-axs2.set_title("Relationship between tricycle capacity and average tricycle productive time")
-axs2.legend()
-axs2.grid(True)
+fig.savefig('figures/fig6.png')
+
+ax.clear()
+trend = plot_reg(ax, valid['capacity'], valid['prod'])
+means = bucket_means(valid, 'numTrikes', [3, 15])
+st.write(f'Average: {means["prod"][3]}, {means["prod"][15]}')
+st.write(f'Trend: {trend[0]}, {trend[1]}')
+
+ax.set_xlabel("Tricycle Capacity (number of passengers)")
+ax.set_ylabel("Average Tricycle Productive Time (%)")
+ax.set_title("Relationship between tricycle capacity and average tricycle productive time")
+ax.legend()
+ax.grid(True)
 
 st.pyplot(fig)
-plt.savefig('figures/fig7.png', bbox_inches='tight')
+fig.savefig('figures/fig7.png')
+plt.close(fig)
 
 showSimulation = st.selectbox("Choose a simulation to view", simulations)
 
 if showSimulation:
+    try:
+        showSimulation.load_entities()
+    except Exception as e:
+        st.exception(e)
+        st.stop()
+
     metaTab, trikeTab, passengerTab = st.tabs(["View Summary", "View Tricycle Stats", "View Passenger Stats"])
 
     with metaTab:
         st.header("Metadata")
-        with open(os.path.join('data', 'real', showSimulation.name, 'metadata.json')) as f:
-            metadata = json.load(f)
-        st.write(metadata)
+        st.write(showSimulation.metadata)
 
         st.header("Tricycles")
         trike_headers = ["ProductiveTravel", "UnproductiveTravel", "IdleWaiting"]
@@ -1,4 +1,5 @@
-import json
+import math
+import numpy as np
 import util
 from scenarios.util import gen_random_bnf_roam_path
 from enum import Enum
@@ -11,6 +12,11 @@ S_ENQUEUE_RADIUS_METERS = 50  # Smaller radius for enqueueing when tricycle is s
 DROPOFF_RADIUS_METERS = 20  # Increased radius for actual dropoff
 PICKUP_RADIUS_METERS = 20  # Increased radius for actual pickup
 
+# SPATIAL INDEX PARAMETERS
+METERS_PER_DEGREE = math.radians(1) * 6_371_000  # One degree of arc on the sphere util.haversine measures with
+GRID_CELL_METERS = 100  # Side of a grid cell used for bucketing passengers in the map
+VECTORIZE_MIN_PASSENGERS = 16  # Below this, a plain loop beats the overhead of a NumPy distance pass
+
 class PassengerStatus(Enum):
     WAITING = 0
     ENQUEUED = 1
@@ -30,6 +36,8 @@ class NoMorePassengers(Exception):
         super().__init__(*args)
 
 class Point:
+    __slots__ = ('x', 'y')
+
     def __init__(self, x, y):
         self.x = x
         self.y = y
@@ -44,23 +52,25 @@ class Point:
         }
     
     def __repr__(self):
-        return json.dumps(self.toJSON())
+        return f"({self.x},{self.y})"
 
 class Path:
+    __slots__ = ('path',)
+
     def __init__(self, *args):
         self.path = [Point(*p) for p in args]
     
     def toJSON(self):
         return {
             "type": "path",
-            "data": self.path.toJSON()
+            "data": [p.toJSON() for p in self.path]
         }
     
     def __str__(self):
         return '-'.join([str(p) for p in self.path])
     
     def __repr__(self) -> str:
-        return json.dumps(self.toJSON())
+        return f"Path[{len(self.path)} points]"
 
     def start(self):
         return self.path[0]
@@ -68,15 +78,19 @@ class Path:
     def end(self):
         return self.path[-1]
     
+    def getCoordinates(self):
+        "Returns the x and y coordinates of the points as two arrays"
+        xs = np.fromiter((p.x for p in self.path), dtype=np.float64, count=len(self.path))
+        ys = np.fromiter((p.y for p in self.path), dtype=np.float64, count=len(self.path))
+        return xs, ys
+
     def getDistance(self):
-        res = 0
-        curPoint = self.path[0]
-        for nxtPoint in self.path[1:]:
-            res += util.get_euclidean_distance(curPoint.toTuple(), nxtPoint.toTuple())
-            curPoint = nxtPoint
-        return res
+        xs, ys = self.getCoordinates()
+        return float(np.hypot(np.diff(xs), np.diff(ys)).sum())
 
 class Cycle:
+    __slots__ = ('path',)
+
     def __init__(self, *args):
         assert len(args) > 1, f"Found {len(args)} points. Cycle must have at least 2 points"
         self.path = [*args]
@@ -91,14 +105,10 @@ class Cycle:
         return self.path[0]
     
     def getNearestPointIndex(self, other):
-        points_with_dist = list(map(
-                                lambda index: (
-                                    util.get_euclidean_distance(
-                                        other.toTuple(), self.path[index].toTuple()
-                                    ), index), 
-                                range(len(self.path))
-                            ))
-        return min(points_with_dist)[1]
+        # squared distances are enough for comparing, so skip the sqrt
+        pts = self.path
+        ox, oy = other.x, other.y
+        return min(range(len(pts)), key=lambda i: (pts[i].x - ox) ** 2 + (pts[i].y - oy) ** 2)
     
     def getNextPoint(self, other):
         curIndex = self.getNearestPointIndex(other)
@@ -106,7 +116,7 @@ class Cycle:
         return self.path[nxtIndex]
 
     def __repr__(self) -> str:
-        return json.dumps(self.toJSON())
+        return f"Cycle[{len(self.path)} points]"
 
 class Map:
     """
@@ -118,18 +128,54 @@ class Map:
             x_min: float,
             y_min: float,
             x_max: float,
-            y_max: float
+            y_max: float,
+            cellSizeMeters: float = GRID_CELL_METERS
     ):
         self.x_min = x_min
         self.x_max = x_max
         self.y_min = y_min
         self.y_max = y_max
         
-        # Store all passengers in a flat list for now
-        # TODO: Consider implementing spatial indexing (e.g., R-tree) for better performance
+        # Passengers are kept in a flat list and also bucketed into square grid
+        # cells (keyed by cell coordinates) so proximity queries only have to
+        # look at the cells around a point instead of every passenger
+        self.cellSize = cellSizeMeters / METERS_PER_DEGREE
         self.passengers = []
+        self.grid: dict[tuple[int, int], list['Passenger']] = {}
         self.tricycles = []  # Track all tricycles in the map
     
+    def getCell(self, point: Point) -> tuple[int, int]:
+        """
+        Returns the coordinates of the grid cell containing the point.
+        """
+        return (math.floor(point.x / self.cellSize), math.floor(point.y / self.cellSize))
+    
+    def ringsForRadius(self, point: Point, radiusMeters: float) -> int:
+        """
+        Returns the number of rings of cells around the point's cell that must be
+        searched to cover every point within the specified radius.
+        """
+        # a degree of longitude is shorter than a degree of latitude, so it bounds the radius
+        radiusDegrees = radiusMeters / (METERS_PER_DEGREE * math.cos(math.radians(point.y)))
+        return math.ceil(radiusDegrees / self.cellSize)
+    
+    def getPassengersInRing(self, point: Point, ring: int) -> list['Passenger']:
+        """
+        Returns the passengers in the cells exactly `ring` cells away from the
+        point's cell (ring 0 is the point's own cell).
+        """
+        cx, cy = self.getCell(point)
+        if ring == 0:
+            return list(self.grid.get((cx, cy), []))
+        
+        found = []
+        for dx in range(-ring, ring + 1):
+            # the top and bottom rows of the ring are fully covered, the rest only at the sides
+            step = 1 if abs(dx) == ring else 2 * ring
+            for dy in range(-ring, ring + 1, step):
+                found.extend(self.grid.get((cx + dx, cy + dy), []))
+        return found
+    
     def addPassenger(self, passenger: 'Passenger'):
         """
         Adds a passenger to the map.
@@ -141,12 +187,32 @@ class Map:
                       proximity detection, status updates, and event tracking.
         """
         self.passengers.append(passenger)
+        self.grid.setdefault(self.getCell(passenger.src), []).append(passenger)
     
     def removePassenger(self, passenger: 'Passenger'):
         """
         Removes a passenger from the map.
         """
         self.passengers = list(filter(lambda x: x != passenger, self.passengers))
+        cell = self.getCell(passenger.src)
+        if cell in self.grid:
+            self.grid[cell] = [x for x in self.grid[cell] if x != passenger]
+            if not self.grid[cell]:
+                del self.grid[cell]
+    
+    def distancesTo(self, point: Point, passengers: list['Passenger']) -> np.ndarray:
+        """
+        Returns the haversine distance in meters from the point to each passenger's
+        source. Larger groups are computed in one vectorized pass.
+        """
+        if len(passengers) < VECTORIZE_MIN_PASSENGERS:
+            return np.array([util.haversine(point.x, point.y, passenger.src.x, passenger.src.y) for passenger in passengers])
+        return util.haversine_to_points(
+            point.x,
+            point.y,
+            [passenger.src.x for passenger in passengers],
+            [passenger.src.y for passenger in passengers]
+        )
     
     def getNearbyPassengers(self, point: Point, radiusMeters: float) -> list['Passenger']:
         """
@@ -154,18 +220,51 @@ class Map:
         Uses haversine distance for accurate distance calculation.
         """
         nearby = []
-        for passenger in self.passengers:
-            distance = util.haversine(*point.toTuple(), *passenger.src.toTuple())
-            if distance <= radiusMeters:
-                nearby.append(passenger)
+        for ring in range(self.ringsForRadius(point, radiusMeters) + 1):
+            candidates = self.getPassengersInRing(point, ring)
+            if not candidates:
+                continue
+            within = self.distancesTo(point, candidates) <= radiusMeters
+            nearby.extend(passenger for passenger, isWithin in zip(candidates, within) if isWithin)
         return nearby
     
+    def nearestInRings(
+            self,
+            point: Point,
+            maxRings: int,
+            status: 'PassengerStatus | None' = None
+    ) -> 'Passenger | None':
+        """
+        Returns the passenger nearest to the point, walking outward ring by ring
+        and stopping as soon as no farther ring can hold a closer passenger.
+        Only passengers with the given status are considered, if one is provided.
+        Returns None if there is no such passenger within maxRings rings.
+        """
+        # the closest a point in ring r can be is r-1 cells away along the shorter (longitude) axis
+        cellMeters = self.cellSize * METERS_PER_DEGREE * math.cos(math.radians(point.y))
+        nearest = None
+        nearestDistance = math.inf
+        for ring in range(maxRings + 1):
+            if nearest is not None and nearestDistance <= (ring - 1) * cellMeters:
+                break
+            candidates = self.getPassengersInRing(point, ring)
+            if status is not None:
+                candidates = [passenger for passenger in candidates if passenger.status == status]
+            if not candidates:
+                continue
+            distances = self.distancesTo(point, candidates)
+            index = int(distances.argmin())
+            if distances[index] < nearestDistance:
+                nearest = candidates[index]
+                nearestDistance = float(distances[index])
+        return nearest
+    
     def isAtLocation(self, point1: Point, point2: Point, thresholdMeters: float = 2.0) -> bool:
         """
         Checks if two points are within the specified threshold distance of each other.
         Uses haversine distance for accurate distance calculation.
         """
-        distance = util.haversine(*point1.toTuple(), *point2.toTuple())
+        distance = util.haversine(point1.x, point1.y, point2.x, point2.y)
         return distance <= thresholdMeters
     
     def getBounds(self) -> tuple[float, float, float, float]:
@@ -196,6 +295,8 @@ class Actor:
     visualization.
     """
 
+    __slots__ = ('createTime', 'deathTime', 'path', 'events')
+
     def __init__(
             self,
             createTime: int,
@@ -216,6 +317,8 @@ class Passenger(Actor):
     Represents a passenger in the simulation.
     Handles its own state transitions and event recording.
     """
+    __slots__ = ('id', 'src', 'dest', 'status', 'pickupTime', 'claimed_by')
+
     def __init__(
             self, 
             id,
@@ -335,8 +438,8 @@ class Passenger(Actor):
         return f'P[{self.src} to {self.dest}]'
 
     def __repr__(self) -> str:
-        """Returns a JSON string representation of the passenger."""
-        return json.dumps(self.toJSON())
+        """Returns a short debug string; use toJSON for serialization."""
+        return f"{self.id}[{self.src!r}->{self.dest!r}]"
 
 class Tricycle(Actor):
     """
@@ -347,6 +450,15 @@ class Tricycle(Actor):
     4. Path Management - maintains and updates routes using OSRM
     """
 
+    __slots__ = (
+        'id', 'map', 'capacity', 'speed', 'active', 'useMeters',
+        'roamPath', 'scheduler', 'cycleCount', 'maxCycles',
+        's_enqueue_radius_meters', 'enqueue_radius_meters',
+        'isRoaming', 'x', 'y', 'passengers', 'enqueuedPassenger', 'status',
+        'totalDistance', 'totalProductiveDistance', 'totalDistanceM', 'totalProductiveDistanceM',
+        'waitingTime', 'to_go'
+    )
+
     def __init__(
             self,
             id,
@@ -454,13 +566,13 @@ class Tricycle(Actor):
         # print(f"Tricycle {self.id} attempting to move from {cur.toTuple()} to {nxt.toTuple()}", flush=True)
 
         if self.useMeters:
-            distRequiredM = util.haversine(*cur.toTuple(), *nxt.toTuple())
+            distRequiredM = util.haversine(cur.x, cur.y, nxt.x, nxt.y)
             distTravelledM = min(distRequiredM, self.speed)
             distRequired = distRequiredM
             distTravelled = distTravelledM
         else:
             distRequired = util.get_euclidean_distance(cur.toTuple(), nxt.toTuple())
-            distRequiredM = util.haversine(*cur.toTuple(), *nxt.toTuple())
+            distRequiredM = util.haversine(cur.x, cur.y, nxt.x, nxt.y)
             distTravelled = min(distRequired, self.speed * MS_PER_FRAME)
             distTravelledM = 0 if distRequired == 0 else distRequiredM * (distTravelled/distRequired)
 
@@ -710,24 +822,11 @@ class Tricycle(Actor):
         if remaining_capacity <= 0:
             return None
         
-        # Get nearby passengers using the new Map method
+        # Only take the closest waiting passenger, searching only the grid cells within the radius
         radius = self.s_enqueue_radius_meters if self.hasPassenger() else self.enqueue_radius_meters
-        nearby_passengers = self.map.getNearbyPassengers(cur, radius)
-        
-        # Sort passengers by distance
-        passenger_distances = []
-        for p in nearby_passengers:
-            if p.status == PassengerStatus.WAITING:
-                distance = util.haversine(*cur.toTuple(), *p.src.toTuple())
-                passenger_distances.append((distance, p))
-        
-        # Sort by distance
-        passenger_distances.sort(key=lambda x: x[0])
+        p = self.map.nearestInRings(cur, self.map.ringsForRadius(cur, radius), PassengerStatus.WAITING)
         
-        # Only take the closest passenger
-        if passenger_distances:
-            distance, p = passenger_distances[0]
-            
+        if p is not None and util.haversine(cur.x, cur.y, p.src.x, p.src.y) <= radius:
             # Update passenger status to ENQUEUED and claim them
             p.onEnqueue(self.id, current_time, [p.src.x, p.src.y])
             self.enqueuedPassenger = p  # Track enqueued passenger
@@ -907,7 +1006,7 @@ class Tricycle(Actor):
         # Check if any passengers destinations are within DROPOFF_RADIUS_METERS
         for index, p in enumerate(self.passengers[:]):
             # Calculate distance using haversine (in meters)
-            distance = util.haversine(*cur.toTuple(), *p.dest.toTuple())
+            distance = util.haversine(cur.x, cur.y, p.dest.x, p.dest.y)
             # print(f"Tricycle {self.id} is {distance:.2f}m away from {p.id}'s destination at {p.dest.toTuple()}", flush=True)
             if distance <= DROPOFF_RADIUS_METERS:
                 dropped_any = True
@@ -1100,10 +1199,13 @@ class Tricycle(Actor):
         }
 
     def __repr__(self) -> str:
-        """Returns a JSON string representation of the tricycle."""
-        return json.dumps(self.toJSON())
+        """Returns a short debug string; use toJSON for serialization."""
+        location = self.path[-1] if self.path else None
+        return f"{self.id}<{self.status.name} at {location!r}, {len(self.passengers)} passengers>"
 
 class Terminal:
+    __slots__ = ('location', 'capacity', 'queue', 'passengers')
+
     def __init__(
             self,
             location: Point,
@@ -1,15 +1,137 @@
 import os
-import json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    import json
 import math
 import scipy
 import streamlit as st
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import numpy as np
-import seaborn as sns
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+
+DATA_DIR = os.path.join('data', 'real')
+IO_WORKERS = 8
+PIE_GRID_COLUMNS = 4
+MAX_PASSENGER_BARS = 500
+
+# keys that only runs from the current simulator version have
+REQUIRED_METADATA = {'isRealistic', 'lastActivityTime', 'smartScheduling'}
+
+def read_json(path):
+    # orjson parses bytes directly, so skip the text-mode decode
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r') as f:
+        return json.load(f)
+
+@st.cache_data(show_spinner=False)
+def load_run_info(name: str, mtime: float, _metadata: dict | None = None) -> dict:
+    """
+    Parses the small per-run files of a simulation (metadata, terminals and roam
+    endpoints). The directory mtime is only used as part of the cache key, so
+    reruns skip the parsing entirely until the simulation directory changes.
+    Metadata that was already parsed can be passed in so it is not read again.
+    """
+    metadata = _metadata
+    if metadata is None:
+        metadata = read_json(os.path.join(DATA_DIR, name, 'metadata.json'))
+    
+    # validate if metadata is updated
+    if not REQUIRED_METADATA.issubset(metadata):
+        raise ValueError(f"Outdated metadata, missing {REQUIRED_METADATA - metadata.keys()}")
+
+    # Load terminal data
+    terminals = read_json(os.path.join(DATA_DIR, name, 'terminals.json'))
+
+    # Load roaming endpoints
+    roam_endpoints = read_json(os.path.join(DATA_DIR, name, 'roam_endpoints.json'))
+
+    return {
+        "metadata": metadata,
+        "terminals": terminals,
+        "roam_endpoints": roam_endpoints
+    }
+
+@st.cache_data(show_spinner=False)
+def load_run_entities(name: str, mtime: float) -> dict:
+    """
+    Parses the tricycles and passengers of a simulation. This is the expensive
+    part of a run, so it is only done when a view actually needs the entities.
+    """
+    numTrikes, _, numPassengers, _ = name.split('-')
+
+    trikes_path = os.path.join(DATA_DIR, name, 'trikes.json')
+    passengers_path = os.path.join(DATA_DIR, name, 'passengers.json')
+    if os.path.exists(trikes_path) and os.path.exists(passengers_path):
+        raw_trikes = read_json(trikes_path)
+        raw_passengers = read_json(passengers_path)
+    else:
+        # older runs only have the per-entity files, which are small and many, so read them concurrently
+        trike_paths = [os.path.join(DATA_DIR, name, f'trike_{i}.json') for i in range(int(numTrikes))]
+        passenger_paths = [os.path.join(DATA_DIR, name, f'passenger_{i}.json') for i in range(int(numPassengers))]
+        with ThreadPoolExecutor(max_workers=IO_WORKERS) as ex:
+            raw_trikes = list(ex.map(read_json, trike_paths))
+            raw_passengers = list(ex.map(read_json, passenger_paths))
+
+    # derive the time split of every tricycle in one batch of array operations
+    speed = np.array([data["speed"] for data in raw_trikes], dtype=np.float64)
+    total_distance = np.array([data["totalDistance"] for data in raw_trikes], dtype=np.float64)
+    productive_distance = np.array([data["productiveDistance"] for data in raw_trikes], dtype=np.float64)
+    productive_distance_m = np.array([data["totalProductiveDistanceM"] for data in raw_trikes], dtype=np.float64)
+    waiting_time = np.maximum(0, np.array([data["waitingTime"] for data in raw_trikes], dtype=np.float64))
+    productive_time = productive_distance_m/speed
+    unproductive_time = (total_distance-productive_distance)/speed
+    total_time = waiting_time + productive_time + unproductive_time
+
+    trikes = [
+        {
+            "totalDistance": data["totalDistance"],
+            "productiveDistance": data["productiveDistance"],
+            "waitingTimeSeconds": waiting,
+            "speed": data["speed"],
+            "productiveTravelTimeSeconds": productive,
+            "unproductiveTravelTimeSeconds": unproductive,
+            "totalTimeSeconds": total,
+            "isRoaming": data["isRoaming"],
+            "events": data["events"]
+        }
+        for data, waiting, productive, unproductive, total in zip(
+            raw_trikes, waiting_time.tolist(), productive_time.tolist(), unproductive_time.tolist(), total_time.tolist()
+        )
+    ]
+
+    passengers = []
+    for data in raw_passengers:
+        if data["pickupTime"] == -1:  # Skip passengers that were never picked up
+            continue
+        passenger = {
+            "id": data["id"],
+            "waitingTime": data["pickupTime"]-data["createTime"],  # Time from creation to pickup
+            "travelingTime": data["deathTime"]-data["pickupTime"],  # Time from pickup to dropoff
+            "waitingTimeSeconds": (data["pickupTime"]-data["createTime"]),
+            "travelingTimeSeconds": (data["deathTime"]-data["pickupTime"]),
+            "events": data["events"]
+        }
+        passengers.append(passenger)
+
+    # a tricycle with no time on the clock has no productive fraction, so it is left
+    # out here just as it is from the avg_trike_productive_fraction metadata
+    has_time = total_time > 0
+    return {
+        "trikes": trikes,
+        "trike_prod_frac": productive_time[has_time]/total_time[has_time],
+        "passengers": passengers
+    }
 
 class SimulationRun:
-    def __init__(self, name):
+    def __init__(self, name, metadata=None):
         self.name = name
         numTrikes, numTerminals, numPassengers, seed = name.split('-')
         self.numTrikes = int(numTrikes)
@@ -17,280 +139,394 @@ class SimulationRun:
         self.numPassengers = int(numPassengers)
         self.seed = seed
 
-        with open(os.path.join('data', 'real', self.name, 'metadata.json')) as f:
-            self.metadata = json.load(f)
-        
-        # validate if metadata is updated
-        if 'isRealistic' not in self.metadata:
-            raise Exception("Not realistic")
-        if 'lastActivityTime' not in self.metadata:
-            raise Exception("Wrong metadata")
-        if 'smartScheduling' not in self.metadata:
-            raise Exception("Wrong metadata")
-        
+        self.mtime = os.path.getmtime(os.path.join(DATA_DIR, name))
+        run = load_run_info(name, self.mtime, metadata)
+        self.metadata = run["metadata"]
+        self.terminals = run["terminals"]
+        self.roam_endpoints = run["roam_endpoints"]
+
         self.trikeCapacity = self.metadata['trikeConfig'].get('capacity', 3)
         self.useSmartScheduler = self.metadata.get('smartScheduling', True)
         self.isRealistic = self.metadata.get('isRealistic', True)
         self.roamingTrikeChance = self.metadata.get('roamingTrikeChance', 0.0)
 
-        # Load terminal data
-        with open(os.path.join('data', 'real', self.name, 'terminals.json')) as f:
-            self.terminals = json.load(f)
-
-        # Load roaming endpoints
-        with open(os.path.join('data', 'real', self.name, 'roam_endpoints.json')) as f:
-            self.roam_endpoints = json.load(f)
-
-        self.trikes = []
-        for i in range(self.numTrikes):
-            with open(os.path.join('data', 'real', self.name, f'trike_{i}.json')) as f:
-                data = json.load(f)
-                trike = {
-                    "totalDistance": data["totalDistance"],
-                    "productiveDistance": data["productiveDistance"],
-                    "waitingTimeSeconds": max(0, data["waitingTime"]),
-                    "speed": data["speed"],
-                    "productiveTravelTimeSeconds": data["totalProductiveDistanceM"]/data["speed"],
-                    "unproductiveTravelTimeSeconds": (data["totalDistance"]-data["productiveDistance"])/data["speed"],
-                    "isRoaming": data["isRoaming"],
-                    "events": data["events"]
-                }
-                trike["totalTimeSeconds"] = trike["waitingTimeSeconds"] + trike["productiveTravelTimeSeconds"] + trike["unproductiveTravelTimeSeconds"]
-                self.trikes.append(trike)
-
-        self.passengers = []
-        for i in range(self.numPassengers):
-            with open(os.path.join('data', 'real', self.name, f'passenger_{i}.json')) as f:
-                data = json.load(f)
-                if data["pickupTime"] == -1:  # Skip passengers that were never picked up
-                    continue
-                passenger = {
-                    "waitingTime": data["pickupTime"]-data["createTime"],  # Time from creation to pickup
-                    "travelingTime": data["deathTime"]-data["pickupTime"],  # Time from pickup to dropoff
-                    "waitingTimeSeconds": (data["pickupTime"]-data["createTime"]),
-                    "travelingTimeSeconds": (data["deathTime"]-data["pickupTime"]),
-                    "events": data["events"]
-                }
-                self.passengers.append(passenger)
+    # the tricycles and passengers are only loaded on first access, so listing
+    # simulations with precomputed averages only reads their metadata
 
-    def __str__(self):
-        return f'<{self.seed} | Trikes: {self.numTrikes}, Terminals: {self.numTerminals}, Passengers: {self.numPassengers}>'
+    @cached_property
+    def trikes(self):
+        return load_run_entities(self.name, self.mtime)["trikes"]
 
-st.header("Simulation Analysis")
+    @cached_property
+    def passengers(self):
+        return load_run_entities(self.name, self.mtime)["passengers"]
 
-simulations: list[SimulationRun] = []
-for case in os.listdir(os.path.join('data', 'real')):
-    try:
-        simulation = SimulationRun(case)
-        simulations.append(simulation)
-    except Exception as e:
-        pass
-
-simulations = sorted(simulations, key=lambda x: (x.numTrikes, x.numPassengers, x.name), reverse=True)
-
-st.header("Summary")
-
-# scatter plot for overall progressions
-valid_simulations = list(filter(lambda x : x.useSmartScheduler and x.trikeCapacity == 3 and x.numPassengers == 100, simulations))
-x_values = [x.numTrikes for x in valid_simulations]
-y_values_trike_productive = [sum([x["productiveTravelTimeSeconds"]/x["totalTimeSeconds"] for x in y.trikes])/len(y.trikes) for y in valid_simulations]
-y_values_pass_wait = [sum([x["waitingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations]
-y_values_pass_travel = [sum([x["travelingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations]
-
-# Create figures directory if it doesn't exist
-os.makedirs('figures', exist_ok=True)
-
-# Plot 1: Passenger Waiting Time
-fig, axs0 = plt.subplots(nrows=1)
-p = sns.regplot(x='x', y='y', data=pd.DataFrame({'x': x_values, 'y': y_values_pass_wait}), ci=None, ax=axs0, logx=True)
-values_left = [sum([x["waitingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations if y.numTrikes == 3]
-values_right = [sum([x["waitingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations if y.numTrikes == 15]
-st.write(f'Average: {sum(values_left)/(60*len(values_left))}, {sum(values_right)/(60*len(values_right))}')
-st.write(f'Trend: {p.get_lines()[0].get_ydata()[0]/60}, {p.get_lines()[0].get_ydata()[-1]/60}')
-
-axs0.set_xlabel("Number of Tricycles")
-axs0.set_ylabel("Average Passenger Waiting Time (s)")
-axs0.set_title("Relationship between the number of tricycles and average passenger waiting time")
-axs0.legend()
-axs0.grid(True)
-
-st.pyplot(fig)
-plt.savefig('figures/roaming_fig1.png', bbox_inches='tight')
-
-# Plot 2: Passenger Traveling Time
-fig, axs1 = plt.subplots(nrows=1)
-p = sns.regplot(x='x', y='y', data=pd.DataFrame({'x': x_values, 'y': y_values_pass_travel}), ci=None, ax=axs1)
-values_left = [sum([x["travelingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations if y.numTrikes == 3]
-values_right = [sum([x["travelingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations if y.numTrikes == 15]
-st.write(f'Average: {sum(values_left)/(60*len(values_left))}, {sum(values_right)/(60*len(values_right))}')
-st.write(f'Trend: {p.get_lines()[0].get_ydata()[0]/60}, {p.get_lines()[0].get_ydata()[-1]/60}')
-
-axs1.set_xlabel("Number of Tricycles")
-axs1.set_ylabel("Average Passenger Traveling Time (s)")
-axs1.set_title("Relationship between the number of tricycles and average passenger traveling time")
-axs1.legend()
-axs1.grid(True)
-
-st.pyplot(fig)
-plt.savefig('figures/roaming_fig2.png', bbox_inches='tight')
-
-# Plot 3: Tricycle Productive Time
-fig, axs2 = plt.subplots(nrows=1)
-p = sns.regplot(x='x', y='y', data=pd.DataFrame({'x': x_values, 'y': y_values_trike_productive}), ci=None, ax=axs2)
-values_left = [sum([x["productiveTravelTimeSeconds"]/x["totalTimeSeconds"] for x in y.trikes])/len(y.trikes) for y in valid_simulations if y.numTrikes == 3]
-values_right = [sum([x["productiveTravelTimeSeconds"]/x["totalTimeSeconds"] for x in y.trikes])/len(y.trikes) for y in valid_simulations if y.numTrikes == 15]
-st.write(f'Average: {sum(values_left)/(len(values_left))}, {sum(values_right)/(len(values_right))}')
-st.write(f'Trend: {p.get_lines()[0].get_ydata()[0]}, {p.get_lines()[0].get_ydata()[-1]}')
-
-axs2.set_xlabel("Number of Tricycles")
-axs2.set_ylabel("Average Tricycles Productive Time (%)")
-axs2.set_title("Relationship between the number of tricycles and average tricycle productive time")
-axs2.legend()
-axs2.grid(True)
-
-st.pyplot(fig)
-plt.savefig('figures/roaming_fig3.png', bbox_inches='tight')
-
-# Scheduling Analysis
-st.header("Scheduling Analysis")
-valid_simulations = list(filter(lambda x: x.numPassengers == 100 and x.trikeCapacity == 3, simulations))
-x_values_naive = [x.numTrikes for x in valid_simulations if not x.useSmartScheduler]
-x_values_smart = [x.numTrikes for x in valid_simulations if x.useSmartScheduler]
-y_values_pass_naive = [sum([x["travelingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations if not y.useSmartScheduler]
-y_values_pass_smart = [sum([x["travelingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations if y.useSmartScheduler]
-
-figSched, axsSched = plt.subplots(nrows=1)
-p = sns.regplot(x='x', y='y', data=pd.DataFrame({'x': x_values_naive, 'y': y_values_pass_naive}), ci=None, ax=axsSched, label="FIFO")
-values_left = [sum([x["travelingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations if y.numTrikes == 3 and not y.useSmartScheduler]
-values_right = [sum([x["travelingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations if y.numTrikes == 15 and not y.useSmartScheduler]
-st.write(f'Average: {sum(values_left)/(60*len(values_left))}, {sum(values_right)/(60*len(values_right))}')
-st.write(f'Trend: {p.get_lines()[0].get_ydata()[0]/60}, {p.get_lines()[0].get_ydata()[-1]/60}')
-
-p = sns.regplot(x='x', y='y', data=pd.DataFrame({'x': x_values_smart, 'y': y_values_pass_smart}), ci=None, ax=axsSched, label="Optimized Scheduling")
-values_left = [sum([x["travelingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations if y.numTrikes == 3 and y.useSmartScheduler]
-values_right = [sum([x["travelingTimeSeconds"] for x in y.passengers])/len(y.passengers) for y in valid_simulations if y.numTrikes == 15 and y.useSmartScheduler]
-st.write(f'Average: {sum(values_left)/(60*len(values_left))}, {sum(values_right)/(60*len(values_right))}')
-st.write(f'Trend: {p.get_lines()[0].get_ydata()[0]/60}, {p.get_lines()[0].get_ydata()[-1]/60}')
-
-axsSched.set_xlabel("Number of Tricycles")
-axsSched.set_ylabel("Average Passenger Traveling Time (s)")
-axsSched.set_title("Effect of using Optimized Scheduling on Average Passenger Traveling Time")
-axsSched.legend()
-axsSched.grid(True)
-
-st.pyplot(figSched)
-plt.savefig('figures/roaming_fig4.png', bbox_inches='tight')
+    # struct-of-arrays views used by the summary plots
 
-# Individual Simulation Analysis
-showSimulation = st.selectbox("Choose a simulation to view", simulations)
-
-if showSimulation:
-    metaTab, trikeTab, passengerTab = st.tabs(["View Summary", "View Tricycle Stats", "View Passenger Stats"])
-
-    with metaTab:
-        st.header("Metadata")
-        st.write(showSimulation.metadata)
-
-        st.header("Tricycles")
-        trike_headers = ["ProductiveTravel", "UnproductiveTravel", "IdleWaiting"]
-        trike_values = [
-            sum([x["productiveTravelTimeSeconds"]/x["totalTimeSeconds"] for x in showSimulation.trikes]),
-            sum([x["unproductiveTravelTimeSeconds"]/x["totalTimeSeconds"] for x in showSimulation.trikes]),
-            sum([x["waitingTimeSeconds"]/x["totalTimeSeconds"] for x in showSimulation.trikes]),
-        ]
-
-        fig, ax = plt.subplots()
-        wedges, texts, autotexts = ax.pie(trike_values, autopct='%1.1f%%', startangle=90)
-        ax.axis('equal')
-        ax.legend(wedges, trike_headers, title="Category", loc="center left", bbox_to_anchor=(1, 0, 0.5, 1))
-        st.pyplot(fig)
-
-        st.header("Passengers")
-        pass_waiting_time = [x["waitingTime"] for x in showSimulation.passengers]
-        pass_traveling_time = [x["travelingTime"] for x in showSimulation.passengers]
-        
-        fig_pass, axs = plt.subplots(ncols=2)
-        axs[0].hist(pass_waiting_time, bins=20)
-        axs[0].set_title("Passenger Waiting Times")
-        axs[0].set_xlabel("Waiting time")
-        axs[0].set_ylabel("Frequency")
-
-        axs[1].hist(pass_traveling_time, bins=20)
-        axs[1].set_title("Passenger Traveling Times")
-        axs[1].set_xlabel("Traveling time")
-        axs[1].set_ylabel("Frequency")
-        st.pyplot(fig_pass)
-
-    with trikeTab:
-        try:
-            st.header("Tricycles")
-            headers = ["ProductiveTravel", "UnproductiveTravel", "IdleWaiting"]
-            fig, axs = plt.subplots(ncols=1, nrows=math.ceil(showSimulation.numTrikes/1), figsize=(7,30))
-
-            for ax, trike in zip(axs, showSimulation.trikes):
-                values = [
-                    trike["productiveTravelTimeSeconds"], 
-                    trike["unproductiveTravelTimeSeconds"],
-                    trike["waitingTimeSeconds"]
-                ]
-                wedges, texts, autotexts = ax.pie(values, autopct='%1.1f%%', startangle=90)
-                ax.axis('equal')
-                ax.legend(wedges, headers, title="Category", loc="center left", bbox_to_anchor=(1, 0, 0.5, 1))
+    @cached_property
+    def trike_prod_frac(self):
+        return load_run_entities(self.name, self.mtime)["trike_prod_frac"]
 
-            st.pyplot(fig)
+    @cached_property
+    def pass_wait(self):
+        return np.array([p["waitingTimeSeconds"] for p in self.passengers], dtype=np.float64)
 
-            # Add roaming tricycle analysis
-            if showSimulation.roam_endpoints:
-                st.header("Roaming Tricycle Analysis")
-                roaming_trikes = [t for t in showSimulation.trikes if t["isRoaming"]]
-                if roaming_trikes:
-                    st.write(f"Number of roaming tricycles: {len(roaming_trikes)}")
-                    st.write("Roaming paths:")
-                    for endpoint in showSimulation.roam_endpoints:
-                        st.write(f"Tricycle {endpoint['tricycle_id']}: {endpoint['start_point']} -> {endpoint['end_point']}")
+    @cached_property
+    def pass_travel(self):
+        return np.array([p["travelingTimeSeconds"] for p in self.passengers], dtype=np.float64)
 
-        except Exception as e:
-            st.exception(e)
+    def __str__(self):
+        return f'<{self.seed} | Trikes: {self.numTrikes}, Terminals: {self.numTerminals}, Passengers: {self.numPassengers}>'
+
+st.header("Simulation Analysis")
 
-    with passengerTab:
+def read_valid_metadata(case: str) -> dict | None:
+    """
+    Cheap pre-check so that only runs with an up-to-date metadata file and a
+    trikes-terminals-passengers-seed name are fully loaded. Returns the parsed
+    metadata, or None if the run should be skipped.
+    """
+    parts = case.split('-')
+    if len(parts) != 4 or not all(part.isdigit() for part in parts[:3]):
+        return None
+    try:
+        metadata = read_json(os.path.join(DATA_DIR, case, 'metadata.json'))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(metadata, dict) or not REQUIRED_METADATA.issubset(metadata):
+        return None
+    return metadata
+
+@st.cache_data(show_spinner=False)
+def load_simulations(listing: tuple) -> tuple[list[SimulationRun], list[tuple[str, str]]]:
+    """
+    Loads every valid simulation in the data directory. The listing of
+    (name, mtime) pairs is the cache key, so the list is only rebuilt when a
+    simulation is added, removed or rewritten. Runs that fail to load are
+    returned separately as (name, error) pairs instead of stopping the rest.
+    """
+    def try_load(case):
+        metadata = read_valid_metadata(case)
+        if metadata is None:
+            return None
         try:
-            st.header("Passengers")
-            waiting_times = [passenger["waitingTime"] for passenger in showSimulation.passengers]
-            traveling_times = [passenger["travelingTime"] for passenger in showSimulation.passengers]
+            return SimulationRun(case, metadata)
+        except Exception as e:
+            # runs aborted before the simulator wrote everything can be missing files
+            return case, f"{type(e).__name__}: {e}"
+
+    with ThreadPoolExecutor(max_workers=IO_WORKERS) as ex:
+        loaded = [result for result in ex.map(try_load, [case for case, _ in listing]) if result is not None]
+    simulations = [result for result in loaded if isinstance(result, SimulationRun)]
+    skipped = [result for result in loaded if not isinstance(result, SimulationRun)]
+    return simulations, skipped
+
+with os.scandir(DATA_DIR) as it:
+    listing = tuple(sorted((entry.name, entry.stat().st_mtime) for entry in it if entry.is_dir()))
+simulations, skipped_runs = load_simulations(listing)
+if skipped_runs:
+    st.warning(f"Skipped {len(skipped_runs)} simulation(s) that could not be loaded: " + ", ".join(f"{name} ({error})" for name, error in skipped_runs))
+
+SUMMARY_COLUMNS = ["name", "numTrikes", "numPassengers", "trikeCapacity", "useSmartScheduler", "avg_pass_wait", "avg_pass_travel", "avg_trike_prod"]
+
+@st.cache_data(show_spinner=False)
+def build_summary(listing: tuple, _simulations: list[SimulationRun]) -> pd.DataFrame:
+    """
+    Flattens the simulations into one row of aggregates each. The simulations
+    themselves are not hashed; the directory listing already identifies them.
+    """
+    def summary_row(s):
+        # newer runs store the aggregates in their metadata, so only fall back
+        # to the per-entity arrays for older runs
+        metadata = s.metadata
+        return {
+            "name": s.name,
+            "numTrikes": s.numTrikes,
+            "numPassengers": s.numPassengers,
+            "trikeCapacity": s.trikeCapacity,
+            "useSmartScheduler": s.useSmartScheduler,
+            "avg_pass_wait": metadata["avg_passenger_waiting_s"] if "avg_passenger_waiting_s" in metadata else s.pass_wait.mean(),
+            "avg_pass_travel": metadata["avg_passenger_travel_s"] if "avg_passenger_travel_s" in metadata else s.pass_travel.mean(),
+            "avg_trike_prod": metadata["avg_trike_productive_fraction"] if "avg_trike_productive_fraction" in metadata else s.trike_prod_frac.mean()
+        }
+
+    summary_df = pd.DataFrame([summary_row(s) for s in _simulations], columns=SUMMARY_COLUMNS)
+    return summary_df.sort_values(['numTrikes', 'numPassengers', 'name'], ascending=False)
+
+summary_df = build_summary(listing, simulations)
+
+# the summary index still refers to the load order, so use it to order the runs
+simulations = [simulations[i] for i in summary_df.index]
+
+@st.cache_resource(show_spinner=False)
+def make_trend_plot(series: tuple, xlabel: str, ylabel: str, title: str, logx: bool = False):
+    """
+    Scatter plot with a least-squares trend line per (label, x values, y values)
+    entry in series, fit against log(x) when logx is set. Cached as a resource on
+    the input values so unchanged plots are not refit and redrawn on every rerun.
+    """
+    fig, ax = plt.subplots(nrows=1)
+    for label, x, y in series:
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        points = ax.scatter(x, y, label=label)
+
+        # a single line per series is all the plots need, so skip seaborn's
+        # regplot machinery and fit it directly
+        line_x = line_y = np.empty(0)
+        if len(np.unique(x)) > 1:
+            slope, intercept = np.polyfit(np.log(x) if logx else x, y, 1)
+            line_x = np.linspace(x.min(), x.max(), 100)
+            line_y = intercept + slope * (np.log(line_x) if logx else line_x)
+        ax.plot(line_x, line_y, color=points.get_facecolor()[0])
+
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.legend()
+    ax.grid(True)
+
+    # the cache owns the figure from here on, so drop it from pyplot's registry
+    plt.close(fig)
+    return fig
+
+@st.cache_data(show_spinner=False)
+def bin_times(arr_bytes: bytes, bins: int):
+    """
+    Histogram counts and bin edges of a float64 array passed as raw bytes, which
+    are much cheaper for the cache to hash than the array itself.
+    """
+    return np.histogram(np.frombuffer(arr_bytes, dtype=np.float64), bins=bins)
+
+def trend_endpoints(fig, index=0):
+    """Returns the first and last y values of the index-th trend line in fig."""
+    ydata = fig.axes[0].get_lines()[index].get_ydata()
+    if len(ydata) == 0:
+        return float('nan'), float('nan')
+    return ydata[0], ydata[-1]
+
+@st.fragment
+def summary_view():
+    """Summary and scheduling plots; only depends on the loaded simulations."""
+    st.header("Summary")
+
+    # scatter plot for overall progressions
+    valid = summary_df[summary_df.useSmartScheduler & (summary_df.trikeCapacity == 3) & (summary_df.numPassengers == 100)]
+    # averages for the smallest and largest fleet sizes, NaN when there are no such runs
+    means = valid.groupby('numTrikes')[['avg_pass_wait', 'avg_pass_travel', 'avg_trike_prod']].mean().reindex([3, 15])
+    x_values = tuple(valid['numTrikes'])
+
+    # Create figures directory if it doesn't exist
+    os.makedirs('figures', exist_ok=True)
+
+    # Plot 1: Passenger Waiting Time
+    fig = make_trend_plot(
+        ((None, x_values, tuple(valid['avg_pass_wait'])),),
+        "Number of Tricycles",
+        "Average Passenger Waiting Time (s)",
+        "Relationship between the number of tricycles and average passenger waiting time",
+        logx=True
+    )
+    values_left, values_right = means['avg_pass_wait']
+    trend_left, trend_right = trend_endpoints(fig)
+    st.write(f'Average: {values_left/60}, {values_right/60}')
+    st.write(f'Trend: {trend_left/60}, {trend_right/60}')
+
+    st.pyplot(fig)
+    fig.savefig('figures/roaming_fig1.png', bbox_inches='tight')
+
+    # Plot 2: Passenger Traveling Time
+    fig = make_trend_plot(
+        ((None, x_values, tuple(valid['avg_pass_travel'])),),
+        "Number of Tricycles",
+        "Average Passenger Traveling Time (s)",
+        "Relationship between the number of tricycles and average passenger traveling time"
+    )
+    values_left, values_right = means['avg_pass_travel']
+    trend_left, trend_right = trend_endpoints(fig)
+    st.write(f'Average: {values_left/60}, {values_right/60}')
+    st.write(f'Trend: {trend_left/60}, {trend_right/60}')
+
+    st.pyplot(fig)
+    fig.savefig('figures/roaming_fig2.png', bbox_inches='tight')
+
+    # Plot 3: Tricycle Productive Time
+    fig = make_trend_plot(
+        ((None, x_values, tuple(valid['avg_trike_prod'])),),
+        "Number of Tricycles",
+        "Average Tricycles Productive Time (%)",
+        "Relationship between the number of tricycles and average tricycle productive time"
+    )
+    values_left, values_right = means['avg_trike_prod']
+    trend_left, trend_right = trend_endpoints(fig)
+    st.write(f'Average: {values_left}, {values_right}')
+    st.write(f'Trend: {trend_left}, {trend_right}')
+
+    st.pyplot(fig)
+    fig.savefig('figures/roaming_fig3.png', bbox_inches='tight')
+
+    # Scheduling Analysis
+    st.header("Scheduling Analysis")
+    valid = summary_df[(summary_df.numPassengers == 100) & (summary_df.trikeCapacity == 3)]
+    sched_means = valid.groupby(['useSmartScheduler', 'numTrikes'])['avg_pass_travel'].mean()
+    naive = valid[~valid.useSmartScheduler]
+    smart = valid[valid.useSmartScheduler]
+
+    figSched = make_trend_plot(
+        (
+            ("FIFO", tuple(naive['numTrikes']), tuple(naive['avg_pass_travel'])),
+            ("Optimized Scheduling", tuple(smart['numTrikes']), tuple(smart['avg_pass_travel']))
+        ),
+        "Number of Tricycles",
+        "Average Passenger Traveling Time (s)",
+        "Effect of using Optimized Scheduling on Average Passenger Traveling Time"
+    )
+    for i, useSmartScheduler in enumerate((False, True)):
+        values_left = sched_means.get((useSmartScheduler, 3), float('nan'))
+        values_right = sched_means.get((useSmartScheduler, 15), float('nan'))
+        trend_left, trend_right = trend_endpoints(figSched, i)
+        st.write(f'Average: {values_left/60}, {values_right/60}')
+        st.write(f'Trend: {trend_left/60}, {trend_right/60}')
+
+    st.pyplot(figSched)
+    figSched.savefig('figures/roaming_fig4.png', bbox_inches='tight')
 
-            fig, ax = plt.subplots(figsize=(10, 8))
-            indices = np.arange(len(showSimulation.passengers))
+# Individual Simulation Analysis
+@st.fragment
+def individual_sim_view():
+    """
+    Per-simulation tabs. Picking another simulation only reruns this fragment,
+    so the summary plots above are not rebuilt.
+    """
+    showSimulation = st.selectbox("Choose a simulation to view", simulations)
 
-            ax.barh(indices, waiting_times, color='skyblue', label='WaitingTime')
-            ax.barh(indices, traveling_times, left=waiting_times, color='lightgreen', label='TravelingTime')
+    if showSimulation:
+        metaTab, trikeTab, passengerTab, terminalTab = st.tabs(["View Summary", "View Tricycle Stats", "View Passenger Stats", "View Terminals"])
 
-            ax.set_xlabel('Time')
-            ax.set_ylabel('Passengers')
-            ax.set_title('Waiting and Traveling Times of Passengers')
-            ax.legend()
+        with metaTab:
+            st.header("Metadata")
+            st.write(showSimulation.metadata)
 
+            st.header("Tricycles")
+            trike_headers = ["ProductiveTravel", "UnproductiveTravel", "IdleWaiting"]
+            trike_values = [
+                sum([x["productiveTravelTimeSeconds"]/x["totalTimeSeconds"] for x in showSimulation.trikes]),
+                sum([x["unproductiveTravelTimeSeconds"]/x["totalTimeSeconds"] for x in showSimulation.trikes]),
+                sum([x["waitingTimeSeconds"]/x["totalTimeSeconds"] for x in showSimulation.trikes]),
+            ]
+
+            fig, ax = plt.subplots()
+            wedges, texts, autotexts = ax.pie(trike_values, autopct='%1.1f%%', startangle=90)
+            ax.axis('equal')
+            ax.legend(wedges, trike_headers, title="Category", loc="center left", bbox_to_anchor=(1, 0, 0.5, 1))
             st.pyplot(fig)
+            plt.close(fig)
 
-            # Add passenger event analysis
-            st.header("Passenger Events")
-            for passenger in showSimulation.passengers:
-                st.write(f"Passenger {passenger['id']} events:")
-                for event in passenger["events"]:
-                    st.write(f"- {event['type']} at time {event['time']}")
-
-        except Exception as e:
-            st.exception(e)
-
-    with terminalTab:
-        try:
-            st.header("Terminals")
-            for terminal in showSimulation.terminals:
-                st.write(f"Terminal {terminal['id']}:")
-                st.write(f"- Location: {terminal['location']}")
-                st.write(f"- Capacity: {terminal['capacity']}")
-                st.write(f"- Remaining passengers: {terminal['remaining_passengers']}")
-                st.write(f"- Remaining tricycles: {terminal['remaining_tricycles']}")
-                st.write("---")
-
-        except Exception as e:
-            st.exception(e) 
\ No newline at end of file
+            st.header("Passengers")
+            fig_pass, axs = plt.subplots(ncols=2)
+            counts, edges = bin_times(showSimulation.pass_wait.tobytes(), 20)
+            axs[0].bar(edges[:-1], counts, width=np.diff(edges), align='edge')
+            axs[0].set_title("Passenger Waiting Times")
+            axs[0].set_xlabel("Waiting time")
+            axs[0].set_ylabel("Frequency")
+
+            counts, edges = bin_times(showSimulation.pass_travel.tobytes(), 20)
+            axs[1].bar(edges[:-1], counts, width=np.diff(edges), align='edge')
+            axs[1].set_title("Passenger Traveling Times")
+            axs[1].set_xlabel("Traveling time")
+            axs[1].set_ylabel("Frequency")
+            st.pyplot(fig_pass)
+            plt.close(fig_pass)
+
+        with trikeTab:
+            try:
+                st.header("Tricycles")
+                headers = ["ProductiveTravel", "UnproductiveTravel", "IdleWaiting"]
+                # lay the pies out in a bounded grid instead of one tall column
+                ncols = min(PIE_GRID_COLUMNS, max(1, showSimulation.numTrikes))
+                nrows = math.ceil(showSimulation.numTrikes/ncols)
+                fig, axs = plt.subplots(ncols=ncols, nrows=nrows, figsize=(3*ncols, 3*nrows), squeeze=False)
+                axs = axs.ravel()
+
+                for ax, trike in zip(axs, showSimulation.trikes):
+                    values = [
+                        trike["productiveTravelTimeSeconds"], 
+                        trike["unproductiveTravelTimeSeconds"],
+                        trike["waitingTimeSeconds"]
+                    ]
+                    wedges, texts, autotexts = ax.pie(values, autopct='%1.1f%%', startangle=90)
+                    ax.axis('equal')
+                for ax in axs[len(showSimulation.trikes):]:
+                    ax.axis('off')
+                if showSimulation.trikes:
+                    fig.legend(wedges, headers, title="Category", loc="center left", bbox_to_anchor=(1, 0.5))
+                fig.tight_layout()
+
+                st.pyplot(fig)
+                plt.close(fig)
+
+                # Add roaming tricycle analysis
+                if showSimulation.roam_endpoints:
+                    st.header("Roaming Tricycle Analysis")
+                    roaming_trikes = [t for t in showSimulation.trikes if t["isRoaming"]]
+                    if roaming_trikes:
+                        st.write(f"Number of roaming tricycles: {len(roaming_trikes)}")
+                        st.write("Roaming paths:")
+                        for endpoint in showSimulation.roam_endpoints:
+                            st.write(f"Tricycle {endpoint['tricycle_id']}: {endpoint['start_point']} -> {endpoint['end_point']}")
+
+            except Exception as e:
+                st.exception(e)
+
+        with passengerTab:
+            try:
+                st.header("Passengers")
+                waiting_times = np.asarray([passenger["waitingTime"] for passenger in showSimulation.passengers])
+                traveling_times = np.asarray([passenger["travelingTime"] for passenger in showSimulation.passengers])
+
+                # average neighbouring passengers into buckets so the bar count stays bounded
+                if len(waiting_times) > MAX_PASSENGER_BARS:
+                    starts = np.linspace(0, len(waiting_times), MAX_PASSENGER_BARS, endpoint=False).astype(int)
+                    counts = np.diff(np.append(starts, len(waiting_times)))
+                    waiting_times = np.add.reduceat(waiting_times, starts) / counts
+                    traveling_times = np.add.reduceat(traveling_times, starts) / counts
+
+                fig, ax = plt.subplots(figsize=(10, 8))
+                indices = np.arange(len(waiting_times))
+
+                ax.barh(indices, waiting_times, color='skyblue', label='WaitingTime')
+                ax.barh(indices, traveling_times, left=waiting_times, color='lightgreen', label='TravelingTime')
+
+                ax.set_xlabel('Time')
+                ax.set_ylabel('Passengers')
+                ax.set_title('Waiting and Traveling Times of Passengers')
+                ax.legend()
+
+                st.pyplot(fig)
+                plt.close(fig)
+
+                # Add passenger event analysis
+                st.header("Passenger Events")
+                # a single table renders far faster than one element per event
+                events_df = pd.DataFrame([{"passenger": passenger["id"], **event} for passenger in showSimulation.passengers for event in passenger["events"]])
+                st.dataframe(events_df)
+
+            except Exception as e:
+                st.exception(e)
+
+        with terminalTab:
+            try:
+                st.header("Terminals")
+                for terminal in showSimulation.terminals:
+                    st.write(f"Terminal {terminal['id']}:")
+                    st.write(f"- Location: {terminal['location']}")
+                    st.write(f"- Capacity: {terminal['capacity']}")
+                    st.write(f"- Remaining passengers: {terminal['remaining_passengers']}")
+                    st.write(f"- Remaining tricycles: {terminal['remaining_tricycles']}")
+                    st.write("---")
+
+            except Exception as e:
+                st.exception(e)
+
+summary_view()
+individual_sim_view()
@@ -1,99 +1,256 @@
 import os
-import json
-import matplotlib.pyplot as plt
-import seaborn as sns
-import pandas as pd
-from datetime import datetime
+import glob
+import pickle
+import hashlib
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    import json
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+
+# The run files are small and many, so reading them is dominated by I/O latency
+# that a thread pool can overlap
+executor = ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4))
+
+# Bump whenever the attributes of SimulationRun change so older pickles are not reused
+CACHE_VERSION = 4
+
+def load_json(path):
+    """Load a single JSON file, using orjson when it is installed"""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def group_masks(smart, max_cycles, trikes, capacity, s_radius, e_radius):
+    """
+    Boolean masks of the runs in each figure group A-D, given one value or one array
+    per run parameter. Every group uses smart scheduling and maxCycles=2 and holds
+    all but one parameter fixed
+    """
+    smart, max_cycles, trikes, capacity, s_radius, e_radius = map(
+        np.asarray, (smart, max_cycles, trikes, capacity, s_radius, e_radius))
+    base = smart.astype(bool) & (max_cycles == 2)
+    return {
+        'A': base & (capacity == 3) & (s_radius == 50) & (e_radius == 100),
+        'B': base & (trikes == 9) & (s_radius == 50) & (e_radius == 100),
+        'C': base & (trikes == 9) & (capacity == 3) & (s_radius == 50),
+        'D': base & (trikes == 9) & (capacity == 3) & (e_radius == 100),
+    }
+
+def in_any_group(metadata):
+    """Whether the run with this metadata.json is plotted in any figure group"""
+    config = metadata['trikeConfig']
+    masks = group_masks(metadata['smartScheduling'], config['maxCycles'], metadata['totalTrikes'],
+                        config['capacity'], config['s_enqueue_radius_meters'], config['enqueue_radius_meters'])
+    return any(bool(mask) for mask in masks.values())
 
 class SimulationRun:
-    def __init__(self, run_dir):
-        """Initialize from a simulation run directory"""
+    def __init__(self, run_dir, metadata=None):
+        """Initialize from a simulation run directory, optionally with its already loaded metadata"""
         self.run_dir = run_dir
         
         # Load metadata
-        with open(os.path.join(run_dir, 'metadata.json'), 'r') as f:
-            metadata = json.load(f)
-            self.metadata = metadata
-            self.numTrikes = metadata['totalTrikes']
-            self.useSmartScheduler = metadata['smartScheduling']
-            self.trikeCapacity = metadata['trikeConfig']['capacity']
-            self.s_enqueue_radius = metadata['trikeConfig']['s_enqueue_radius_meters']
-            self.enqueue_radius = metadata['trikeConfig']['enqueue_radius_meters']
-            self.maxCycles = metadata['trikeConfig']['maxCycles']
+        if metadata is None:
+            metadata = load_json(os.path.join(run_dir, 'metadata.json'))
+        self.metadata = metadata
+        self.numTrikes = metadata['totalTrikes']
+        self.useSmartScheduler = metadata['smartScheduling']
+        self.trikeCapacity = metadata['trikeConfig']['capacity']
+        self.s_enqueue_radius = metadata['trikeConfig']['s_enqueue_radius_meters']
+        self.enqueue_radius = metadata['trikeConfig']['enqueue_radius_meters']
+        self.maxCycles = metadata['trikeConfig']['maxCycles']
         
         # Load summary statistics
-        with open(os.path.join(run_dir, 'summary.json'), 'r') as f:
-            self.summary = json.load(f)
+        self.summary = load_json(os.path.join(run_dir, 'summary.json'))
         
-        # Load passenger data
-        self.passengers = []
-        for filename in os.listdir(run_dir):
-            if filename.startswith('passenger_') and filename.endswith('.json'):
-                with open(os.path.join(run_dir, filename), 'r') as f:
-                    passenger_data = json.load(f)
-                    passenger = {
-                        "waitingTime": passenger_data['pickupTime'] - passenger_data['createTime'],
-                        "travelingTime": passenger_data['deathTime'] - passenger_data['pickupTime'],
-                        "waitingTimeSeconds": passenger_data['pickupTime'] - passenger_data['createTime'],
-                        "travelingTimeSeconds": passenger_data['deathTime'] - passenger_data['pickupTime']
-                    }
-                    self.passengers.append(passenger)
-        
-        # Load tricycle data
-        self.trikes = []
-        for filename in os.listdir(run_dir):
-            if filename.startswith('trike_') and filename.endswith('.json'):
-                with open(os.path.join(run_dir, filename), 'r') as f:
-                    trike_data = json.load(f)
-                    trike = {
-                        "totalDistance": trike_data['totalDistance'],
-                        "productiveDistance": trike_data['productiveDistance'],
-                        "waitingTimeSeconds": max(0, trike_data['waitingTime']),
-                        "speed": trike_data['speed'],
-                        "productiveTravelTimeSeconds": trike_data['totalProductiveDistanceM']/trike_data['speed'],
-                        "unproductiveTravelTimeSeconds": (trike_data['totalDistance']-trike_data['productiveDistance'])/trike_data['speed']
-                    }
-                    trike["totalTimeSeconds"] = trike["waitingTimeSeconds"] + trike["productiveTravelTimeSeconds"] + trike["unproductiveTravelTimeSeconds"]
-                    self.trikes.append(trike)
+        # Collect the passenger and tricycle files in a single directory pass; they are
+        # only opened once the passengers or trikes of the run are first needed
+        self.passengerPaths = []
+        self.trikePaths = []
+        # trikes.json/passengers.json hold all the entities of a run in one file
+        self.consolidatedPaths = {}
+        with os.scandir(run_dir) as it:
+            for entry in it:
+                name = entry.name
+                if name in ('trikes.json', 'passengers.json'):
+                    self.consolidatedPaths[name] = entry.path
+                elif name.startswith('passenger_') and name.endswith('.json'):
+                    self.passengerPaths.append(entry.path)
+                elif name.startswith('trike_') and name.endswith('.json'):
+                    self.trikePaths.append(entry.path)
+        self.numPassengers = len(self.passengerPaths)
+
+    @cached_property
+    def passengers(self):
+        """Passenger data with one array per field"""
+        if 'passengers.json' in self.consolidatedPaths:
+            passengers = load_json(self.consolidatedPaths['passengers.json'])
+        else:
+            passengers = list(executor.map(load_json, self.passengerPaths))
+        waiting_time = np.empty(len(passengers), dtype=np.float64)
+        traveling_time = np.empty(len(passengers), dtype=np.float64)
+        for i, passenger_data in enumerate(passengers):
+            waiting_time[i] = passenger_data['pickupTime'] - passenger_data['createTime']
+            traveling_time[i] = passenger_data['deathTime'] - passenger_data['pickupTime']
+        return {
+            "waitingTimeSeconds": waiting_time,
+            "travelingTimeSeconds": traveling_time
+        }
+
+    @cached_property
+    def trikes(self):
+        """Tricycle data with one array per field"""
+        if 'trikes.json' in self.consolidatedPaths:
+            trikes = load_json(self.consolidatedPaths['trikes.json'])
+        else:
+            trikes = list(executor.map(load_json, self.trikePaths))
+        total_distance = np.empty(len(trikes), dtype=np.float64)
+        productive_distance = np.empty(len(trikes), dtype=np.float64)
+        total_productive_distance = np.empty(len(trikes), dtype=np.float64)
+        waiting_time = np.empty(len(trikes), dtype=np.float64)
+        speed = np.empty(len(trikes), dtype=np.float64)
+        for i, trike_data in enumerate(trikes):
+            total_distance[i] = trike_data['totalDistance']
+            productive_distance[i] = trike_data['productiveDistance']
+            total_productive_distance[i] = trike_data['totalProductiveDistanceM']
+            waiting_time[i] = trike_data['waitingTime']
+            speed[i] = trike_data['speed']
+        trikes = {
+            "waitingTimeSeconds": np.maximum(0, waiting_time),
+            "productiveTravelTimeSeconds": total_productive_distance/speed,
+            "unproductiveTravelTimeSeconds": (total_distance-productive_distance)/speed
+        }
+        trikes["totalTimeSeconds"] = trikes["waitingTimeSeconds"] + trikes["productiveTravelTimeSeconds"] + trikes["unproductiveTravelTimeSeconds"]
+        return trikes
+
+    # Per-run averages used by every figure
+    @cached_property
+    def avgWaitingTime(self):
+        return self.passengers["waitingTimeSeconds"].mean()
+
+    @cached_property
+    def avgTravelingTime(self):
+        return self.passengers["travelingTimeSeconds"].mean()
+
+    @cached_property
+    def avgProductiveRatio(self):
+        # tricycles with no time on the clock are left out, as in the simulator's metadata
+        has_time = self.trikes["totalTimeSeconds"] > 0
+        return (self.trikes["productiveTravelTimeSeconds"][has_time]/self.trikes["totalTimeSeconds"][has_time]).mean()
+
+def plot_reg(ax, x_values, y_values):
+    """Scatter plot of the values with their least-squares trend line"""
+    x = np.asarray(x_values, dtype=np.float64)
+    y = np.asarray(y_values, dtype=np.float64)
+    points = ax.scatter(x, y)
+    # a line needs at least two distinct x values
+    if x.min() != x.max():
+        m, b = np.polyfit(x, y, 1)
+        xs = np.array([x.min(), x.max()])
+        ax.plot(xs, m*xs + b, color=points.get_facecolor()[0])
+
+# (SimulationRun attribute, y axis label, title suffix) of the three figures drawn per group
+METRICS = [
+    ("avgWaitingTime", "Average Passenger Waiting Time (s)", "Average Passenger Waiting Time"),
+    ("avgTravelingTime", "Average Passenger Traveling Time (s)", "Average Passenger Traveling Time"),
+    ("avgProductiveRatio", "Average Tricycle Productive Time (%)", "Average Tricycle Productive Time"),
+]
+
+# Figure shared by all plot_metric calls, created on first use
+shared_figure = None
 
 def plot_metric(sims, x_values, x_label, title_prefix, fig_name):
     """Helper function to create a plot for a specific metric"""
-    fig, ax = plt.subplots(figsize=(10, 6))
-    
-    # Plot waiting time
-    y_values = [sum([p["waitingTimeSeconds"] for p in x.passengers])/len(x.passengers) for x in sims]
-    sns.regplot(x='x', y='y', data=pd.DataFrame({'x': x_values, 'y': y_values}), 
-                ci=None, ax=ax)
-    ax.set_xlabel(x_label)
-    ax.set_ylabel("Average Passenger Waiting Time (s)")
-    ax.set_title(f"{title_prefix} vs Average Passenger Waiting Time")
-    ax.grid(True)
-    plt.savefig(f'figures/fig{fig_name}1.png', bbox_inches='tight')
-    plt.close()
-    
-    # Plot traveling time
-    fig, ax = plt.subplots(figsize=(10, 6))
-    y_values = [sum([p["travelingTimeSeconds"] for p in x.passengers])/len(x.passengers) for x in sims]
-    sns.regplot(x='x', y='y', data=pd.DataFrame({'x': x_values, 'y': y_values}), 
-                ci=None, ax=ax)
-    ax.set_xlabel(x_label)
-    ax.set_ylabel("Average Passenger Traveling Time (s)")
-    ax.set_title(f"{title_prefix} vs Average Passenger Traveling Time")
-    ax.grid(True)
-    plt.savefig(f'figures/fig{fig_name}2.png', bbox_inches='tight')
-    plt.close()
-    
-    # Plot productive time
-    fig, ax = plt.subplots(figsize=(10, 6))
-    y_values = [sum([t["productiveTravelTimeSeconds"]/t["totalTimeSeconds"] for t in x.trikes])/len(x.trikes) for x in sims]
-    sns.regplot(x='x', y='y', data=pd.DataFrame({'x': x_values, 'y': y_values}), 
-                ci=None, ax=ax)
-    ax.set_xlabel(x_label)
-    ax.set_ylabel("Average Tricycle Productive Time (%)")
-    ax.set_title(f"{title_prefix} vs Average Tricycle Productive Time")
-    ax.grid(True)
-    plt.savefig(f'figures/fig{fig_name}3.png', bbox_inches='tight')
-    plt.close()
+    import matplotlib.pyplot as plt
+
+    # One figure is reused for every plot instead of building a new one each time
+    global shared_figure
+    if shared_figure is None:
+        shared_figure, _ = plt.subplots(figsize=(10, 6))
+    fig = shared_figure
+    ax = fig.axes[0]
+    for i, (attr, y_label, title_suffix) in enumerate(METRICS, start=1):
+        ax.clear()
+        y_values = [getattr(x, attr) for x in sims]
+        plot_reg(ax, x_values, y_values)
+        ax.set_xlabel(x_label)
+        ax.set_ylabel(y_label)
+        ax.set_title(f"{title_prefix} vs {title_suffix}")
+        ax.grid(True)
+        fig.savefig(f'figures/fig{fig_name}{i}.png', bbox_inches='tight')
+
+def load_simulations(data_dir):
+    """
+    Load the run directories in data_dir that belong to at least one figure group,
+    skipping the ones that fail to load
+    """
+    simulations = []
+    with os.scandir(data_dir) as it:
+        run_dirs = [entry.name for entry in it if entry.is_dir() and not entry.name.startswith('.')]
+
+    def try_load(run_dir):
+        run_path = os.path.join(data_dir, run_dir)
+        try:
+            # metadata.json is enough to tell whether a run is plotted at all, so the
+            # passenger and trike files of every other run are never opened
+            metadata = load_json(os.path.join(run_path, 'metadata.json'))
+            if not in_any_group(metadata):
+                return None, None
+            simulation = SimulationRun(run_path, metadata)
+            # Only runs with all 100 passengers are plotted, so only their entity files
+            # are read, here in the pool rather than one by one while plotting
+            if simulation.numPassengers == 100:
+                for attr, _, _ in METRICS:
+                    getattr(simulation, attr)
+            return simulation, None
+        except Exception as e:
+            return None, e
+
+    # Load the runs concurrently; each run also reads its own files on the shared executor,
+    # so the runs get their own pool to avoid waiting on themselves
+    with ThreadPoolExecutor(max_workers=8) as run_executor:
+        for run_dir, (simulation, error) in zip(run_dirs, run_executor.map(try_load, run_dirs)):
+            if error is not None:
+                print(f"Failed to load simulation {run_dir}: {str(error)}")
+                continue
+            if simulation is None:
+                continue
+            simulations.append(simulation)
+            print(f"Loaded simulation with {simulation.numTrikes} tricycles, capacity {simulation.trikeCapacity}, s_radius {simulation.s_enqueue_radius}, e_radius {simulation.enqueue_radius}, maxCycles {simulation.maxCycles}")
+    return simulations
+
+def load_or_build_cache(data_dir):
+    """
+    Loads the simulations from a pickle in data/ keyed on the modification times of
+    the run directories, rebuilding it from the JSON files whenever a run changes
+    """
+    run_stats = []
+    with os.scandir(data_dir) as it:
+        for entry in it:
+            if entry.is_dir() and not entry.name.startswith('.'):
+                run_stats.append(f'{entry.path}:{entry.stat().st_mtime_ns}')
+    key = hashlib.sha1('|'.join([str(CACHE_VERSION)] + sorted(run_stats)).encode()).hexdigest()
+    cache_dir = os.path.dirname(data_dir)
+    cache_path = os.path.join(cache_dir, f'plot_cache_{key}.pkl')
+
+    if os.path.exists(cache_path):
+        with open(cache_path, 'rb') as f:
+            simulations = pickle.load(f)
+        print(f"Loaded {len(simulations)} simulations from {cache_path}")
+        return simulations
+
+    simulations = load_simulations(data_dir)
+    # drop caches of older states of the data before writing the new one
+    for stale in glob.glob(os.path.join(cache_dir, 'plot_cache_*.pkl')):
+        os.remove(stale)
+    with open(cache_path, 'wb') as f:
+        pickle.dump(simulations, f, protocol=5)
+    return simulations
 
 def main():
     # Create figures directory if it doesn't exist
@@ -101,20 +258,7 @@ def main():
     
     # Load simulation results
     print("\nLoading simulation results...")
-    simulations = []
-    
-    # Look for simulation directories
-    data_dir = os.path.join('data', 'real')
-    for run_dir in os.listdir(data_dir):
-        run_path = os.path.join(data_dir, run_dir)
-        if os.path.isdir(run_path) and not run_dir.startswith('.'):
-            try:
-                simulation = SimulationRun(run_path)
-                simulations.append(simulation)
-                print(f"Loaded simulation with {simulation.numTrikes} tricycles, capacity {simulation.trikeCapacity}, s_radius {simulation.s_enqueue_radius}, e_radius {simulation.enqueue_radius}, maxCycles {simulation.maxCycles}")
-            except Exception as e:
-                print(f"Failed to load simulation {run_dir}: {str(e)}")
-                continue
+    simulations = load_or_build_cache(os.path.join('data', 'real'))
 
     print(f"\nTotal simulations loaded: {len(simulations)}")
     
@@ -125,7 +269,7 @@ def main():
         return
 
     # Filter valid simulations (100 passengers)
-    valid_simulations = list(filter(lambda x: len(x.passengers) == 100, simulations))
+    valid_simulations = [x for x in simulations if x.numPassengers == 100]
     print(f"\nValid simulations after filtering: {len(valid_simulations)}")
     
     if len(valid_simulations) == 0:
@@ -133,13 +277,29 @@ def main():
         print("1. Are there any simulations with 100 passengers?")
         return
 
+    # Select the runs of the groups A-D below with vectorized masks over their parameters
+    masks = group_masks(
+        [x.useSmartScheduler for x in valid_simulations],
+        [x.maxCycles for x in valid_simulations],
+        [x.numTrikes for x in valid_simulations],
+        [x.trikeCapacity for x in valid_simulations],
+        [x.s_enqueue_radius for x in valid_simulations],
+        [x.enqueue_radius for x in valid_simulations],
+    )
+    group_a_sims, group_b_sims, group_c_sims, group_d_sims = (
+        [valid_simulations[i] for i in np.flatnonzero(masks[group])] for group in 'ABCD')
+
+    # matplotlib is only imported once there is something to plot, so SimulationRun
+    # can be used without it. Figures are only ever saved to disk, so skip loading an
+    # interactive backend, and pin the resolution so the PNG size does not depend on
+    # the local matplotlibrc
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    plt.rcParams['figure.dpi'] = 100
+    plt.rcParams['savefig.dpi'] = 100
+
     # Group A: Number of tricycles (smart scheduling, capacity 3, s_radius=50, e_radius=100, maxCycles=2)
-    group_a_sims = [x for x in valid_simulations 
-                   if x.useSmartScheduler 
-                   and x.trikeCapacity == 3 
-                   and x.s_enqueue_radius == 50 
-                   and x.enqueue_radius == 100 
-                   and x.maxCycles == 2]
     if group_a_sims:
         x_values = [x.numTrikes for x in group_a_sims]
         plot_metric(group_a_sims, x_values, "Number of Tricycles", "Number of Tricycles", "A")
@@ -147,12 +307,6 @@ def main():
         print(f"Found tricycle counts: {sorted(set(x_values))}")
 
     # Group B: Tricycle capacity (smart scheduling, trikes=9, s_radius=50, e_radius=100, maxCycles=2)
-    group_b_sims = [x for x in valid_simulations 
-                   if x.useSmartScheduler 
-                   and x.numTrikes == 9 
-                   and x.s_enqueue_radius == 50 
-                   and x.enqueue_radius == 100 
-                   and x.maxCycles == 2]
     if group_b_sims:
         x_values = [x.trikeCapacity for x in group_b_sims]
         plot_metric(group_b_sims, x_values, "Tricycle Capacity", "Tricycle Capacity", "B")
@@ -160,12 +314,6 @@ def main():
         print(f"Found capacities: {sorted(set(x_values))}")
 
     # Group C: Enqueue radius (smart scheduling, trikes=9, capacity=3, s_radius=50, maxCycles=2)
-    group_c_sims = [x for x in valid_simulations 
-                   if x.useSmartScheduler 
-                   and x.numTrikes == 9 
-                   and x.trikeCapacity == 3 
-                   and x.s_enqueue_radius == 50 
-                   and x.maxCycles == 2]
     if group_c_sims:
         x_values = [x.enqueue_radius for x in group_c_sims]
         plot_metric(group_c_sims, x_values, "Enqueue Radius (meters)", "Enqueue Radius", "C")
@@ -173,18 +321,17 @@ def main():
         print(f"Found enqueue radii: {sorted(set(x_values))}")
 
     # Group D: Serving enqueue radius (smart scheduling, trikes=9, capacity=3, e_radius=100, maxCycles=2)
-    group_d_sims = [x for x in valid_simulations 
-                   if x.useSmartScheduler 
-                   and x.numTrikes == 9 
-                   and x.trikeCapacity == 3 
-                   and x.enqueue_radius == 100 
-                   and x.maxCycles == 2]
     if group_d_sims:
         x_values = [x.s_enqueue_radius for x in group_d_sims]
         plot_metric(group_d_sims, x_values, "Serving Enqueue Radius (meters)", "Serving Enqueue Radius", "D")
         print(f"Generated Group D figures (Serving Enqueue Radius) - {len(group_d_sims)} simulations")
         print(f"Found serving enqueue radii: {sorted(set(x_values))}")
 
+    global shared_figure
+    if shared_figure is not None:
+        plt.close(shared_figure)
+        shared_figure = None
+
     print("\nAll figures have been generated in the 'figures' directory")
 
 if __name__ == '__main__':
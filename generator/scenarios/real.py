@@ -5,18 +5,28 @@ you can modify the Simulator class, specifically, the process_frame function.
 """
 
 import os
+import sys
+import math
 import random
 import json
 import traceback
 import string
 import time
+import logging
+import logging.handlers
+
+import numpy as np
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 import config
 import entities
 import algos
 
 from entities import PassengerStatus, TricycleStatus
-from util import NoRoute, get_euclidean_distance, find_path_between_points_in_osrm
+from util import NoRoute, find_distance_table_in_osrm, haversine_to_points
 
 from scenarios.util import (
     gen_random_valid_point, 
@@ -24,7 +34,16 @@ from scenarios.util import (
     get_valid_points
 )
 
-# TODO: use a logger to make outputting more clean
+# Progress and summaries go through a buffered logger, so a run does not pay for
+# a flushed write to stdout on every line. Records are held in memory and written
+# out when the buffer fills, on errors, and at the end of every run.
+logger = logging.getLogger("sim")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+stdout_handler = logging.StreamHandler(sys.stdout)
+stdout_handler.setFormatter(logging.Formatter("%(message)s"))
+log_buffer = logging.handlers.MemoryHandler(10_000, flushLevel=logging.ERROR, target=stdout_handler)
+logger.addHandler(log_buffer)
 
 class ToImplement(Exception):
     pass
@@ -33,6 +52,16 @@ class ImproperConfig(Exception):
     def __init__(self, *args: object) -> None:
         super().__init__(*args)
 
+def dumps_json(data):
+    """Serialize run output to a JSON string, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(data)
+
+def write_file(path, contents):
+    with open(path, "w+") as f:
+        f.write(contents)
+
 def generate_random_filename(length=12):
     letters = string.ascii_lowercase
     random_filename = ''.join(random.choice(letters) for _ in range(length))
@@ -55,7 +84,7 @@ def smart_scheduler(src: entities.Point, passengers: list[entities.Passenger]) -
     - start_index: int - the index of the next passenger that must be processed based on the provided list
     - next_passenger: entities.Passenger - the actual passenger to be processed next
     """
-    best_order, start_index = algos.sort_path_brute(src, passengers)
+    best_order, start_index = algos.sort_path(src, passengers)
     return start_index, passengers[start_index]
 
 defaultTrikeConfig = {
@@ -68,7 +97,8 @@ defaultTrikeConfig = {
     "enqueue_radius_meters": 200  # Default radius for enqueueing when not serving passengers
 }
 
-cache = None
+# snapped fixed hotspots, keyed on the (y,x) hotspot list they were snapped from
+cache = {}
 
 class Simulator:
     def __init__(
@@ -88,7 +118,8 @@ class Simulator:
             useSmartScheduler = True,
             trikeCapacity = None,
             isRealistic = False,
-            enqueue_radius_meters = None
+            enqueue_radius_meters = None,
+            verbose = False
         ):
         """
         Parameters:
@@ -117,6 +148,7 @@ class Simulator:
         - trikeCapacity: int - the number of passengers tricycles can accommodate at a moment
         - isRealistic: bool - always set this to True, unless you want to deal with great circle coordinate system
         - enqueue_radius_meters: float - the radius for enqueueing when not serving passengers
+        - verbose: bool - if True, also log debug messages while running. Default to False
         """
         self.totalTrikes = totalTrikes
         self.totalTerminals = totalTerminals
@@ -133,6 +165,7 @@ class Simulator:
         self.useSmartScheduler = useSmartScheduler
         self.prefix = '-'.join([str(x) for x in [totalTrikes, totalTerminals, totalPassengers]])
         self.isRealistic = isRealistic
+        self.verbose = verbose
 
         # ensure that there are non-negative count of entities
         if self.totalTerminals < 0:
@@ -188,8 +221,6 @@ class Simulator:
         This generates a new simulation.
         """
 
-        global cache
-
         run_id = f'{self.prefix}-{generate_random_filename()}'
         run_metadata = {
             "id": run_id,
@@ -215,15 +246,18 @@ class Simulator:
         if seed is not None:
             random.seed(seed)
         
-        print(f"Running with the following metadata:", run_metadata, flush=True)
-        start_time = time.time()
-
-        if self.hotspotsCache:
-            validFixedHotspots = self.hotspotsCache
-        else:
+        logger.setLevel(logging.DEBUG if self.verbose else logging.INFO)
+        logger.info("Running with the following metadata: %s", run_metadata)
+        start_time = time.perf_counter()
+
+        # the snapped hotspots are kept per list of fixed hotspots, so a later run with
+        # different hotspots does not reuse the wrong points. Across restarts, the
+        # snapping itself is answered from the OSRM cache on disk
+        hotspots_key = tuple(tuple(point) for point in fixedHotspots)
+        validFixedHotspots = self.hotspotsCache.get(hotspots_key)
+        if validFixedHotspots is None:
             validFixedHotspots = get_valid_points(fixedHotspots)
-            self.hotspotsCache = validFixedHotspots
-            cache = validFixedHotspots
+            self.hotspotsCache[hotspots_key] = validFixedHotspots
 
         # Generate data files
         if not os.path.exists(f"data/real/{run_id}"):
@@ -245,7 +279,7 @@ class Simulator:
         if self.useFixedTerminals:
             for y,x in fixedTerminals:
                 terminal_loc = entities.Point(x,y)
-                # print("Generated Terminal at", terminal_loc, flush=True)
+                logger.debug("Generated Terminal at %s", terminal_loc)
                 terminal = entities.Terminal(
                     location=terminal_loc,
                     capacity=20
@@ -254,12 +288,22 @@ class Simulator:
         else:
             for idx in range(self.totalTerminals):
                 terminal_loc = gen_random_valid_point()
-                # print("Generated Terminal at", terminal_loc, flush=True)
+                logger.debug("Generated Terminal at %s", terminal_loc)
                 terminal = entities.Terminal(
                     location=terminal_loc,
                     capacity=100
                 )
                 terminals.append(terminal)
+
+        # terminals never move, so their coordinates are only looked up once, as
+        # columns that the nearest-terminal search can scan in one go
+        terminal_xy = np.array([terminal.location.toTuple() for terminal in terminals], dtype=np.float64).reshape(-1, 2)
+        terminal_xs, terminal_ys = terminal_xy[:, 0], terminal_xy[:, 1]
+
+        # cumulative weights for drawing a terminal from the configured distributions
+        # with a single binary search per draw
+        trike_cum_weights = np.cumsum(self.terminalTrikeDistrib[:len(terminals)], dtype=np.float64)
+        passenger_cum_weights = np.cumsum(self.terminalPassengerDistrib[:len(terminals)], dtype=np.float64)
         
         # Generate tricycles
         tricycles: list[entities.Tricycle] = []
@@ -289,26 +333,18 @@ class Simulator:
                 
                 # Generate initial roam path
                 if trike.newRoamPath(0):  # Pass current_time=0
-                    # print(f"Generated {trike.id} with initial roam path at {start_hotspot.toTuple()}", flush=True)
-                    pass
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Generated %s with initial roam path at %s", trike.id, start_hotspot.toTuple())
                 else:
-                    # print(f"Failed to generate initial roam path for {trike.id}", flush=True)
-                    pass
+                    logger.debug("Failed to generate initial roam path for %s", trike.id)
             else:
                 # Generate non-roaming tricycles at terminals
                 if len(self.terminalTrikeDistrib):
-                    trike_source = None
-                    x = random.random()
-                    for terminal, chance in zip(terminals, self.terminalTrikeDistrib):
-                        if x < chance:
-                            trike_source = entities.Point(*terminal.location.toTuple())
-                            in_terminal = terminal
-                            break
-                        else:
-                            x -= chance
-                    
-                    if trike_source is None:
+                    if not len(trike_cum_weights) or trike_cum_weights[-1] <= 0:
                         raise Exception("Improper trike distribution")
+                    terminal_idx = np.searchsorted(trike_cum_weights, random.random() * trike_cum_weights[-1], side='right')
+                    in_terminal = terminals[min(terminal_idx, len(terminals) - 1)]
+                    trike_source = entities.Point(*in_terminal.location.toTuple())
                 else:
                     in_terminal = random.choice(terminals)
                     trike_source = entities.Point(*in_terminal.location.toTuple())
@@ -334,7 +370,8 @@ class Simulator:
                 if in_terminal:
                     in_terminal.addTricycle(trike)
 
-                # print("Generated {} at {}".format(trike.id, trike_source.toTuple()), flush=True)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Generated %s at %s", trike.id, trike_source.toTuple())
 
             map.addTricycle(trike)
             tricycles.append(trike)
@@ -358,7 +395,9 @@ class Simulator:
                             passenger_dest = random.choice(validFixedHotspots)
                         else:
                             passenger_dest = gen_random_valid_point()
-                        find_path_between_points_in_osrm(passenger_source.toTuple(), passenger_dest.toTuple())
+                        distances = find_distance_table_in_osrm([passenger_source.toTuple(), passenger_dest.toTuple()])
+                        if math.isnan(distances[0][1]):
+                            continue
                         break
                     except Exception:
                         continue
@@ -380,18 +419,11 @@ class Simulator:
                 else:
                     passenger_dest = gen_random_valid_point()
                 if len(self.terminalPassengerDistrib):
-                    passenger_source = None
-                    x = random.random()
-                    for terminal, chance in zip(terminals, self.terminalPassengerDistrib):
-                        if x < chance:
-                            passenger_source = entities.Point(*terminal.location.toTuple())
-                            in_terminal = terminal
-                            break
-                        else:
-                            x -= chance
-                    
-                    if passenger_source is None:
+                    if not len(passenger_cum_weights) or passenger_cum_weights[-1] <= 0:
                         raise Exception("Improper passenger distribution")
+                    terminal_idx = np.searchsorted(passenger_cum_weights, random.random() * passenger_cum_weights[-1], side='right')
+                    in_terminal = terminals[min(terminal_idx, len(terminals) - 1)]
+                    passenger_source = entities.Point(*in_terminal.location.toTuple())
                 else:
                     in_terminal = random.choice(terminals)
                     passenger_source = entities.Point(*in_terminal.location.toTuple())
@@ -409,74 +441,66 @@ class Simulator:
                     in_terminal.addPassenger(passenger)
                 map.addPassenger(passenger)  # Add all passengers to map
 
-            # print("Generated {} at {} going to {}".format(passenger.id, passenger_source.toTuple(), passenger_dest.toTuple()), flush=True)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Generated %s at %s going to %s", passenger.id, passenger_source.toTuple(), passenger_dest.toTuple())
 
             passengers.append(passenger)
             passenger_id += 1
         
         # do the actual simulation
-        # this is an array to make it a non-primitive object
-        cur_time = [0]
-        last_active = [-1]
+        # process_frame advances these through nonlocal
+        cur_time = 0
+        last_active = -1
 
         def process_passenger(passenger: entities.Passenger, trike: entities.Tricycle):
             # print("Passenger loaded", passenger.id, "by", trike.id, flush=True)
-            passenger.pickupTime = cur_time[0]
+            passenger.pickupTime = cur_time
             passenger.status = PassengerStatus.ONBOARD
 
         def process_frame():
             """
             Each frame is generated here. You can modify the subtleties of the interactions here.
             """
-            
+            nonlocal cur_time, last_active
+            now = cur_time
+
+            # Tricycles only become inactive while they are moved (finishing or parking in a
+            # terminal) and only become active again when a terminal pops them after
+            # the moves, so the active ones are collected once and shared by every pass
+            active_trikes = [trike for trike in tricycles if trike.active]
+
             # 1. First detect nearby passengers and plan routes
-            for trike in tricycles:
-                if not trike.active:
-                    continue
+            for trike in active_trikes:
                 # Only roaming tricycles should look for passengers on the road
                 if trike.isRoaming or trike.status == TricycleStatus.SERVING:
-                    p = trike.enqueueNearbyPassenger(cur_time[0])
+                    p = trike.enqueueNearbyPassenger(now)
                     if p:
                         # print(f"----Detected passenger {p.id} for {trike.id}", flush=True)
                         pass
             
             # 2. Handle offloading/loading
-            for trike in tricycles:
-                if not trike.active:
-                    continue
-
-                # Offloading
-                offloaded = list(trike.tryOffload(cur_time[0]))
+            for trike in active_trikes:
 
-                for passenger in offloaded:
-                    # print("----Offloaded", passenger.id, trike.id, flush=True)
-                    pass
-                if offloaded:
-                    last_active[0] = cur_time[0]
+                # Offloading. tryOffload already returns a fresh list, so it is used as is
+                if trike.tryOffload(now):
+                    last_active = now
 
                 # Loading
-                loaded: list[entities.Passenger] = trike.tryLoad(cur_time[0])
+                loaded: list[entities.Passenger] = trike.tryLoad(now)
 
                 for passenger in loaded:
                     # print("----Loaded", passenger.id, trike.id, flush=True)
                     process_passenger(passenger, trike)
                 
             # 3. Move tricycles
-            for trike in tricycles:
-                if not trike.active:
-                    continue
+            for trike in active_trikes:
                 try:
-                    time_taken = trike.moveTrike(cur_time[0])
+                    time_taken = trike.moveTrike(now)
 
                     # Trike does not move
                     if not time_taken:
-                        offloaded = list(trike.tryOffload(cur_time[0]))
-
-                        for passenger in offloaded:
-                            # print("----Offloaded", passenger.id, trike.id, flush=True)
-                            pass
-                        if offloaded:
-                            last_active[0] = cur_time[0]
+                        if trike.tryOffload(now):
+                            last_active = now
 
                         if trike.hasPassenger():
                             # print("----Trike didn't move. Will load next passenger", trike.id, flush=True)
@@ -492,51 +516,50 @@ class Simulator:
                             # print("----Trike didnt move. Attempting to go to nearest terminal", trike.id, flush=True)
                             nearest_terminal = None
                             nearest_distance = None
-                            for terminal in terminals:
+                            if terminals:
+                                x, y = trike.curPoint().toTuple()
                                 # Only consider a tricycle to be at a terminal if:
-                                # 1. It's physically close enough, AND
+                                # 1. It's physically close enough (the same 2m as map.isAtLocation), AND
                                 # 2. It's in a state where it can be picked up by a terminal
-                                is_at_terminal = (
-                                    map.isAtLocation(terminal.location, trike.curPoint()) and 
-                                    trike.status in [TricycleStatus.IDLE, TricycleStatus.RETURNING]
-                                )
-                                if is_at_terminal:
+                                at_terminal = []
+                                if trike.status in [TricycleStatus.IDLE, TricycleStatus.RETURNING]:
+                                    at_terminal = np.flatnonzero(haversine_to_points(x, y, terminal_xs, terminal_ys) <= 2.0)
+                                if len(at_terminal):
+                                    terminal = terminals[at_terminal[0]]
                                     # print("------Tricycle parked in terminal", trike.id, terminal.location.toTuple(), flush=True)
                                     terminal.addTricycle(trike)
                                     trike.status = TricycleStatus.TERMINAL
-                                    nearest_terminal = None
                                     nearest_distance = -1
-                                    break
-                                elif nearest_terminal is None or \
-                                    get_euclidean_distance(trike.curPoint().toTuple(), terminal.location.toTuple()) < nearest_distance:
-                                    nearest_terminal = terminal
-                                    nearest_distance = get_euclidean_distance(trike.curPoint().toTuple(), terminal.location.toTuple())
+                                else:
+                                    squared_distances = (terminal_xs - x) ** 2 + (terminal_ys - y) ** 2
+                                    nearest_index = int(squared_distances.argmin())
+                                    nearest_terminal = terminals[nearest_index]
+                                    nearest_distance = math.sqrt(squared_distances[nearest_index])
                             if nearest_terminal is not None:
                                 # print("------Found nearest terminal", nearest_terminal.location.toTuple(), flush=True)
                                 try:
                                     if not trike.updatePath(nearest_terminal.location, priority='front'):
                                         # print("------No Route found. Finishing trip", flush=True)
-                                        trike.finishTrip(cur_time[0])
+                                        trike.finishTrip(now)
                                 except util.NoRoute:
                                     # print("------No Route found. Finishing trip", flush=True)
-                                    trike.finishTrip(cur_time[0])
+                                    trike.finishTrip(now)
                             elif nearest_distance is None:
                                 # print("------Not able to find any terminal. Finishing trip", flush=True)
-                                trike.finishTrip(cur_time[0])
+                                trike.finishTrip(now)
                                 
                         else:
                             # print("----Trike didn't move. Attempting to load next cycle point")
                             # Call onCycleComplete before loading next point
-                            trike.onCycleComplete(cur_time[0])
+                            trike.onCycleComplete(now)
                             trike.loadNextCyclePoint()
                 except Exception as e:
-                    print(f"Encountered error while trying to move tricycle {trike.id}:", e)
-                    print(traceback.format_exc())
-                    trike.finishTrip(cur_time[0])
+                    logger.error("Encountered error while trying to move tricycle %s: %s\n%s", trike.id, e, traceback.format_exc())
+                    trike.finishTrip(now)
                 
             for terminal in terminals:
                 while (not terminal.isEmptyOfPassengers()) and (not terminal.isEmptyOfTrikes()):
-                    loadingResult = terminal.loadTricycle(cur_time[0])
+                    loadingResult = terminal.loadTricycle(now)
                     if len(loadingResult["passengers"]) == 0:
                         break
                     for passenger in loadingResult["passengers"]:
@@ -544,23 +567,28 @@ class Simulator:
                     terminal.popTricycle()
             
             # update the time
-            cur_time[0] += 1 if self.isRealistic else entities.MS_PER_FRAME
+            cur_time = now + (1 if self.isRealistic else entities.MS_PER_FRAME)
+
+        logger.debug("Running the simulation...")
 
-        # print("Running the simulation...", flush=True)
+        # A completed passenger never changes status again, so the passengers before
+        # this index never need to be checked again
+        first_pending = 0
 
-        while cur_time[0] < maxTime:
+        while cur_time < maxTime:
             process_frame()
-            
+
             # Check if all passengers have completed their trips
-            all_passengers_completed = all(passenger.status == PassengerStatus.COMPLETED for passenger in passengers)
-            if all_passengers_completed:
-                print("All passengers have completed their trips. Ending simulation early.", flush=True)
+            while first_pending < len(passengers) and passengers[first_pending].status == PassengerStatus.COMPLETED:
+                first_pending += 1
+            if first_pending == len(passengers):
+                logger.info("All passengers have completed their trips. Ending simulation early.")
                 break
 
-        end_time = time.time()
+        end_time = time.perf_counter()
         elapsed_time = end_time - start_time
 
-        print("Finished simulation {}. Took {} seconds.".format(run_id, elapsed_time), flush=True)
+        logger.info("Finished simulation %s. Took %s seconds.", run_id, elapsed_time)
 
         # Calculate summary statistics
         completed_trips = 0
@@ -585,17 +613,18 @@ class Simulator:
             total_productive_distance += trike.totalProductiveDistanceM
 
         # Print summary
-        print("\nSimulation Summary:")
-        print("------------------")
-        print(f"Total Trips Completed: {completed_trips}")
-        print(f"Completion Rate: {(completed_trips/self.totalPassengers)*100:.1f}%")
-        print(f"Average Wait Time: {total_wait_time/completed_trips if completed_trips > 0 else 0:.1f} seconds")
-        print(f"Average Travel Time: {total_travel_time/completed_trips if completed_trips > 0 else 0:.1f} seconds")
-        print(f"Total Distance Traveled: {total_distance/1000:.1f} km")
-        print(f"Productive Distance: {total_productive_distance/1000:.1f} km")
-        print(f"Efficiency: {(total_productive_distance/total_distance)*100:.1f}%")
-        print(f"Active Tricycles: {active_tricycles}/{self.totalTrikes}")
-        print("------------------")
+        logger.info("\nSimulation Summary:")
+        logger.info("------------------")
+        logger.info("Total Trips Completed: %d", completed_trips)
+        logger.info("Completion Rate: %.1f%%", (completed_trips/self.totalPassengers)*100)
+        logger.info("Average Wait Time: %.1f seconds", total_wait_time/completed_trips if completed_trips > 0 else 0)
+        logger.info("Average Travel Time: %.1f seconds", total_travel_time/completed_trips if completed_trips > 0 else 0)
+        logger.info("Total Distance Traveled: %.1f km", total_distance/1000)
+        logger.info("Productive Distance: %.1f km", total_productive_distance/1000)
+        logger.info("Efficiency: %.1f%%", (total_productive_distance/total_distance)*100)
+        logger.info("Active Tricycles: %d/%d", active_tricycles, self.totalTrikes)
+        logger.info("------------------")
+        log_buffer.flush()
 
         # Return summary statistics
         summary_stats = {
@@ -629,15 +658,11 @@ class Simulator:
         with open(f"data/real/{run_id}/summary.json", "w+") as f:
             json.dump(summary_stats, f, indent=2)
 
-        last_active[0] += 1 if self.isRealistic else entities.MS_PER_FRAME
+        last_active += 1 if self.isRealistic else entities.MS_PER_FRAME
 
         run_metadata["endTime"] = cur_time
         run_metadata["elapsedTime"] = elapsed_time
-        run_metadata["lastActivityTime"] = last_active[0]
-
-        # save the metadata
-        with open(f"data/real/{run_id}/metadata.json", "w+") as f:
-            json.dump(run_metadata, f)
+        run_metadata["lastActivityTime"] = last_active
         
         # save all terminal data in a single file
         terminals_data = []
@@ -650,8 +675,7 @@ class Simulator:
                 "remaining_tricycles": len(terminal.queue)
             }
             terminals_data.append(terminal_data)
-        with open(f"data/real/{run_id}/terminals.json", "w+") as f:
-            json.dump(terminals_data, f)
+        write_file(f"data/real/{run_id}/terminals.json", dumps_json(terminals_data))
         
         # save roam endpoints for roaming tricycles
         roam_endpoints = []
@@ -665,19 +689,42 @@ class Simulator:
                 }
                 roam_endpoints.append(roam_data)
         
-        with open(f"data/real/{run_id}/roam_endpoints.json", "w+") as f:
-            json.dump(roam_endpoints, f)
+        write_file(f"data/real/{run_id}/roam_endpoints.json", dumps_json(roam_endpoints))
         
-        # save the tricycles
+        # save the tricycles and remaining passengers in a single file each so readers
+        # can load a run in one go; runs from before this layout also have a
+        # <id>.json file per entity, which every reader still falls back to
+        trikes_data = []
         for trike in tricycles:
-            trike.deathTime = last_active[0]
-            trike.waitingTime = last_active[0] - trike.totalDistance / trike.speed
-            with open(f"data/real/{run_id}/{trike.id}.json", "w+") as f:
-                f.write(repr(trike))
+            trike.deathTime = last_active
+            trike.waitingTime = last_active - trike.totalDistance / trike.speed
+            trikes_data.append(trike.toJSON())
         
-        # save remaining passengers
+        passengers_data = []
         for passenger in passengers:
-            with open(f"data/real/{run_id}/{passenger.id}.json", "w+") as f:
-                f.write(repr(passenger))
+            passengers_data.append(passenger.toJSON())
+
+        write_file(f"data/real/{run_id}/trikes.json", dumps_json(trikes_data))
+        write_file(f"data/real/{run_id}/passengers.json", dumps_json(passengers_data))
+
+        # precompute the per-run averages used by the dashboards; these only need
+        # the final tricycle waiting times, so they are computed after the loop above
+        picked_up = [p for p in passengers if p.pickupTime != -1]
+        if picked_up:
+            run_metadata["avg_passenger_waiting_s"] = sum(p.pickupTime - p.createTime for p in picked_up) / len(picked_up)
+            run_metadata["avg_passenger_travel_s"] = sum(p.deathTime - p.pickupTime for p in picked_up) / len(picked_up)
+        # a tricycle with no time on the clock has no productive fraction and is left
+        # out of the average; the dashboards apply the same rule to older runs
+        productive_fractions = []
+        for trike in tricycles:
+            productive_time = trike.totalProductiveDistanceM / trike.speed
+            total_time = max(0, trike.waitingTime) + productive_time + (trike.totalDistance - trike.totalProductiveDistance) / trike.speed
+            if total_time > 0:
+                productive_fractions.append(productive_time / total_time)
+        if productive_fractions:
+            run_metadata["avg_trike_productive_fraction"] = sum(productive_fractions) / len(productive_fractions)
+
+        # save the metadata
+        write_file(f"data/real/{run_id}/metadata.json", dumps_json(run_metadata))
         
         return summary_stats
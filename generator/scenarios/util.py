@@ -4,6 +4,8 @@ Helper functions that are used in generating actual scenarios.
 
 import random
 
+import numpy as np
+
 import config
 import entities
 import util
@@ -38,6 +40,15 @@ def get_random_valid_point(points):
     point = entities.Point(*util.find_nearest_point_in_osrm_path(point_raw[1], point_raw[0]))
     return point
 
+def are_connected(*points):
+    """
+    Returns True if each point in the list can be reached by road from the point
+    before it and back. All the pairs are checked with a single OSRM table request.
+    """
+    distances = util.find_distance_table_in_osrm([p.toTuple() for p in points])
+    idx = np.arange(len(points) - 1)
+    return not (np.isnan(distances[idx, idx + 1]).any() or np.isnan(distances[idx + 1, idx]).any())
+
 def gen_random_bnf_roam_path():
     "Returns a back-n-forth path in the map"
 
@@ -46,12 +57,9 @@ def gen_random_bnf_roam_path():
         point_2 = gen_random_valid_point()
 
         try:
-            # must have p1 -> p2
-            util.find_path_between_points_in_osrm(point_1.toTuple(), point_2.toTuple())
-            # must have p2 -> p1
-            util.find_path_between_points_in_osrm(point_2.toTuple(), point_1.toTuple())
-
-            return entities.Cycle(point_1, point_2)
+            # must have p1 -> p2 and p2 -> p1
+            if are_connected(point_1, point_2):
+                return entities.Cycle(point_1, point_2)
         except NoRoute:
             continue
 
@@ -66,20 +74,13 @@ def gen_random_bnf_roam_path_with_points(*points):
             point_2 = gen_random_point()
 
             try:
-                # must have p1 -> p2
-                util.find_path_between_points_in_osrm(point_1.toTuple(), point_2.toTuple())
-                # must have p2 -> p1
-                util.find_path_between_points_in_osrm(point_2.toTuple(), point_1.toTuple())
-
-                return entities.Cycle(point_1, point_2)
+                # must have p1 -> p2 and p2 -> p1
+                if are_connected(point_1, point_2):
+                    return entities.Cycle(point_1, point_2)
             except NoRoute:
                 continue
-    elif len(points) == 2:
-        util.find_path_between_points_in_osrm(points[0].toTuple(), points[1].toTuple())
-        util.find_path_between_points_in_osrm(points[1].toTuple(), points[0].toTuple())
-        return entities.Cycle(points[0], points[1])
     else:
-        for i in range(len(points)-1):
-            util.find_path_between_points_in_osrm(points[i].toTuple(), points[i+1].toTuple())
-            util.find_path_between_points_in_osrm(points[i+1].toTuple(), points[i].toTuple())
+        # consecutive points must be reachable from each other
+        if not are_connected(*points):
+            raise NoRoute
         return entities.Cycle(points[0], points[1])
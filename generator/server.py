@@ -1,13 +1,57 @@
+import os
+import re
 import json
-from flask import Flask, request
+import gzip
+import zlib
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import orjson
+except ImportError:
+    orjson = None
+from flask import Flask, Response, request
 from flask_cors import CORS
 
 # initialize the flask app
 app = Flask(__name__)
 CORS(app)
 
-if __name__ == '__main__':
-    app.run(debug=True, port=5050)
+# a run never changes once it is written, so clients may keep its files around
+RUN_CACHE_CONTROL = 'public, max-age=3600'
+# JSON smaller than this is not worth compressing
+GZIP_MIN_BYTES = 1024
+# per-entity files of runs saved before the single-file layout
+TRIKE_FILE = re.compile(r'trike_(\d+)\.json')
+PASSENGER_FILE = re.compile(r'passenger_(\d+)\.json')
+
+# reads the per-entity files of a run in parallel
+executor = ThreadPoolExecutor(max_workers=8)
+
+def json_response(data, status=200):
+    "Builds a JSON response with orjson when it is installed, instead of Flask's own encoder"
+    body = orjson.dumps(data) if orjson is not None else json.dumps(data)
+    return Response(body, status=status, mimetype='application/json')
+
+def accepts_gzip():
+    return 'gzip' in request.headers.get('Accept-Encoding', '')
+
+@app.after_request
+def compress_response(response):
+    """Gzips JSON responses for clients that accept it, and marks run data as cacheable"""
+    if request.path.startswith('/real/') and response.status_code == 200:
+        response.headers['Cache-Control'] = RUN_CACHE_CONTROL
+    if (
+        accepts_gzip() and
+        response.mimetype == 'application/json' and
+        not response.is_streamed and
+        'Content-Encoding' not in response.headers
+    ):
+        body = response.get_data()
+        if len(body) >= GZIP_MIN_BYTES:
+            response.set_data(gzip.compress(body, compresslevel=6))
+            response.headers['Content-Encoding'] = 'gzip'
+            response.vary.add('Accept-Encoding')
+    return response
 
 @app.route('/')
 def health_check():
@@ -20,59 +64,128 @@ def real_simulation(id, trikes_cnt, pass_cnt):
     the files can be found.
     """
 
-    trikes = []
-    passengers = []
-    for i in range(int(trikes_cnt)):
-        try:
-            with open(f'data/real/{id}/trike_{i}.json') as f:
-                trike = json.load(f)
-                trikes.append(trike)
-        except Exception:
-            pass
-    for i in range(int(pass_cnt)):
-        try:
-            with open(f'data/real/{id}/passenger_{i}.json') as f:
-                passenger = json.load(f)
-                passengers.append(passenger)
-        except Exception:
-            pass
-    return {
-        "trikes": trikes,
-        "passengers": passengers
-    }
+    # runs saved with the single-file layout are streamed as is, without parsing
+    # every tricycle and passenger only to serialize them again
+    run_dir = f'data/real/{id}'
+    trikes_path = os.path.join(run_dir, 'trikes.json')
+    passengers_path = os.path.join(run_dir, 'passengers.json')
+    try:
+        run_metadata = load_run_file(os.path.join(run_dir, 'metadata.json'))
+        is_complete = (
+            int(trikes_cnt) == run_metadata["totalTrikes"] and
+            int(pass_cnt) == run_metadata["totalPassengers"]
+        )
+    except Exception:
+        is_complete = False
+    if is_complete and os.path.exists(trikes_path) and os.path.exists(passengers_path):
+        body = stream_run(trikes_path, passengers_path)
+        if not accepts_gzip():
+            return Response(body, mimetype='application/json')
+        response = Response(gzip_stream(body), mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+        return response
+    if os.path.exists(trikes_path) and os.path.exists(passengers_path):
+        # entities are stored in id order, so a prefix is the same as reading
+        # trike_0..trike_{n-1} and passenger_0..passenger_{m-1}
+        return json_response({
+            "trikes": load_run_file(trikes_path)[:int(trikes_cnt)],
+            "passengers": load_run_file(passengers_path)[:int(pass_cnt)]
+        })
+
+    # runs saved before the single-file layout only have the per-entity files. One
+    # directory listing finds the ones that exist instead of trying every index
+    trike_paths = {}
+    passenger_paths = {}
+    try:
+        with os.scandir(run_dir) as entries:
+            for entry in entries:
+                if match := TRIKE_FILE.fullmatch(entry.name):
+                    trike_paths[int(match.group(1))] = entry.path
+                elif match := PASSENGER_FILE.fullmatch(entry.name):
+                    passenger_paths[int(match.group(1))] = entry.path
+    except OSError:
+        pass
+
+    trike_paths = [trike_paths[i] for i in sorted(trike_paths) if i < int(trikes_cnt)]
+    passenger_paths = [passenger_paths[i] for i in sorted(passenger_paths) if i < int(pass_cnt)]
+    entities = list(executor.map(read_entity_file, trike_paths + passenger_paths))
+    return json_response({
+        "trikes": [trike for trike in entities[:len(trike_paths)] if trike is not None],
+        "passengers": [passenger for passenger in entities[len(trike_paths):] if passenger is not None]
+    })
+
+def read_json_file(path):
+    "Parses a JSON file, using orjson when it is installed"
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read()) if orjson is not None else json.load(f)
+
+def read_entity_file(path):
+    "Parses one per-entity run file, or returns None if it cannot be read"
+    try:
+        return read_json_file(path)
+    except Exception:
+        return None
+
+@lru_cache(maxsize=64)
+def parse_run_file(path, mtime):
+    "Parses a run file. The modification time is only part of the cache key"
+    return read_json_file(path)
+
+def load_run_file(path):
+    """Returns the parsed contents of a run file, reusing the last parse while the file is unchanged"""
+    return parse_run_file(path, os.path.getmtime(path))
+
+def stream_run(trikes_path, passengers_path, chunk_size=1 << 16):
+    """Yields the {"trikes": ..., "passengers": ...} body from the two consolidated files"""
+    yield b'{"trikes": '
+    for path, separator in ((trikes_path, b', "passengers": '), (passengers_path, b'}')):
+        with open(path, 'rb') as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+        yield separator
+
+def gzip_stream(chunks):
+    "Gzips a stream of byte chunks as it is sent"
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
 
 @app.route('/real/<id>/terminals.json')
 def terminals_data(id):
     """Serve all terminal data."""
     try:
-        with open(f'data/real/{id}/terminals.json') as f:
-            return json.load(f)
+        return json_response(read_json_file(f'data/real/{id}/terminals.json'))
     except Exception as e:
-        return {"error": str(e)}, 404
+        return json_response({"error": str(e)}, 404)
 
 @app.route('/real/<id>/roam_endpoints.json')
 def roam_endpoints(id):
     """Serve roam endpoints data."""
     try:
-        with open(f'data/real/{id}/roam_endpoints.json') as f:
-            return json.load(f)
+        return json_response(read_json_file(f'data/real/{id}/roam_endpoints.json'))
     except Exception as e:
-        return {"error": str(e)}, 404
+        return json_response({"error": str(e)}, 404)
 
 @app.route('/real/<id>/metadata.json')
 def metadata(id):
     """Serve metadata."""
     try:
-        with open(f'data/real/{id}/metadata.json') as f:
-            return json.load(f)
+        return json_response(read_json_file(f'data/real/{id}/metadata.json'))
     except Exception as e:
-        return {"error": str(e)}, 404
+        return json_response({"error": str(e)}, 404)
 
 @app.route('/real/<id>/summary.json')
 def summary(id):
     """Serve summary statistics."""
     try:
-        with open(f'data/real/{id}/summary.json') as f:
-            return json.load(f)
+        return json_response(read_json_file(f'data/real/{id}/summary.json'))
     except Exception as e:
-        return {"error": str(e)}, 404
\ No newline at end of file
+        return json_response({"error": str(e)}, 404)
+
+if __name__ == '__main__':
+    # the development server; see the README for serving many clients at once
+    app.run(debug=True, port=5050, threaded=True)
@@ -2,7 +2,16 @@ import os
 import sys
 import time
 import json
+import random
+import itertools
+try:
+    import orjson
+except ImportError:
+    orjson = None
 from datetime import datetime
+from functools import lru_cache
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import traceback
 
 # Add the generator directory to Python path
@@ -10,41 +19,97 @@ generator_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, generator_dir)
 
 from scenarios.real import Simulator
+from scenarios.util import get_valid_points
 import config
+import util
 
 # Global configuration
 NUM_RUNS = 50  # Number of runs per parameter combination
+# Number of simulations run at the same time. Every worker sends its own OSRM requests,
+# so lower this if the OSRM server starts failing under load
+NUM_WORKERS = os.cpu_count() or 1
+# Bounds in seconds of the backoff between retries of a simulation that failed for a
+# reason other than OSRM being down
+RETRY_BASE_WAIT = 1.0
+RETRY_MAX_WAIT = 30
 
-def save_progress(all_results, data_dir):
-    """Save current progress to a temporary file"""
-    temp_file = os.path.join(data_dir, 'simulation_progress.json')
-    with open(temp_file, 'w') as f:
-        json.dump(all_results, f, indent=2)
+def dumps_json(data):
+    """Serialize to JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, separators=(',', ':')).encode()
+
+def loads_json(data):
+    """Parse JSON bytes, using orjson when it is installed"""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+def save_progress(results, data_dir):
+    """Append the results of one finished simulation to the progress file"""
+    temp_file = os.path.join(data_dir, 'simulation_progress.jsonl')
+    with open(temp_file, 'ab') as f:
+        f.write(dumps_json(results) + b'\n')
 
 def load_progress(data_dir):
-    """Load progress from temporary file if it exists"""
-    temp_file = os.path.join(data_dir, 'simulation_progress.json')
-    if os.path.exists(temp_file):
-        with open(temp_file, 'r') as f:
-            return json.load(f)
-    return None
+    """
+    Returns the seeds of the simulations already saved in the progress file, or an
+    empty set if there is none. Only the seeds are kept in memory; the results stay
+    on disk until write_results gathers them.
+    """
+    temp_file = os.path.join(data_dir, 'simulation_progress.jsonl')
+    # progress saved by older versions of this script
+    legacy_file = os.path.join(data_dir, 'simulation_progress.json')
+    if not os.path.exists(temp_file) and os.path.exists(legacy_file):
+        with open(legacy_file, 'rb') as f:
+            all_results = loads_json(f.read())
+        for results in all_results['simulations']:
+            save_progress(results, data_dir)
+        os.remove(legacy_file)
+    if not os.path.exists(temp_file):
+        return set()
 
-def run_simulation(num_trikes, use_smart_scheduler=True, trike_capacity=3, seed=None, max_retries=10, max_wait_time=300, s_enqueue_radius_meters=50, enqueue_radius_meters=200, maxCycles=2):
+    seeds = set()
+    has_bad_lines = False
+    with open(temp_file, 'rb') as f:
+        for line in f:
+            try:
+                seeds.add(loads_json(line)['metadata'].get('seed', ''))
+            except (ValueError, KeyError, TypeError):
+                # the last line may be cut short if the sweep was killed mid-write
+                has_bad_lines = True
+    if has_bad_lines:
+        # rewrite without it, so new results are not appended onto a broken line
+        with open(temp_file, 'rb') as f, open(f'{temp_file}.tmp', 'wb') as out:
+            for line in f:
+                try:
+                    loads_json(line)['metadata']
+                except (ValueError, KeyError, TypeError):
+                    continue
+                out.write(line if line.endswith(b'\n') else line + b'\n')
+        os.replace(f'{temp_file}.tmp', temp_file)
+    return seeds
+
+def write_results(data_dir, final_file):
     """
-    Run a single simulation with the given parameters.
-    
-    Args:
-        num_trikes (int): Number of tricycles to simulate
-        use_smart_scheduler (bool): Whether to use smart scheduling or FIFO
-        trike_capacity (int): Capacity of each tricycle
-        seed (str): Seed string for reproducibility
-        max_retries (int): Maximum number of retries for failed simulations
-        max_wait_time (int): Maximum wait time between retries in seconds
-        s_enqueue_radius_meters (float): Radius for enqueueing when tricycle is serving passengers
-        enqueue_radius_meters (float): Radius for enqueueing when tricycle is not serving passengers
-        maxCycles (int): Maximum number of cycles before generating new path
-    Returns:
-        dict: Simulation results or None if all retries failed
+    Writes every simulation in the progress file to the final results file, one
+    simulation per line, without loading them all into memory at once
+    """
+    temp_file = os.path.join(data_dir, 'simulation_progress.jsonl')
+    with open(final_file, 'wb') as out:
+        out.write(b'{\n  "timestamp": ' + dumps_json(datetime.now().isoformat()) + b',\n  "simulations": [')
+        separator = b'\n    '
+        if os.path.exists(temp_file):
+            with open(temp_file, 'rb') as f:
+                for line in f:
+                    out.write(separator + line.rstrip(b'\n'))
+                    separator = b',\n    '
+        out.write(b'\n  ]\n}\n')
+
+@lru_cache(maxsize=32)
+def get_simulator(num_trikes, use_smart_scheduler, trike_capacity, s_enqueue_radius_meters, enqueue_radius_meters, maxCycles):
+    """
+    Returns the Simulator for a parameter combination. Simulator.run does not change
+    the simulator, so the seeded runs and retries of a combination all share one
+    instance, along with the snapped hotspots it caches.
     """
     # Common parameters
     params = {
@@ -69,21 +134,56 @@ def run_simulation(num_trikes, use_smart_scheduler=True, trike_capacity=3, seed=
         }
     }
     
+    return Simulator(**params)
+
+def prewarm_osrm_cache(hotspots):
+    """
+    Asks OSRM for the routes between every pair of fixed hotspots before the sweep
+    starts. Passengers are dropped off at these hotspots, so the smart scheduler needs
+    the same routes between them in every run; fetching them once here, before the
+    workers start, saves each worker from asking for them on its own.
+    """
+    points = list(dict.fromkeys(tuple(point.toTuple()) for point in get_valid_points(hotspots)))
+    util.prefetch_paths_in_osrm([(p1, p2) for p1 in points for p2 in points if p1 != p2], max_workers=16)
+    util.save_osrm_cache()
+
+def run_simulation(num_trikes, use_smart_scheduler=True, trike_capacity=3, seed=None, max_retries=10, max_wait_time=300, s_enqueue_radius_meters=50, enqueue_radius_meters=200, maxCycles=2):
+    """
+    Run a single simulation with the given parameters.
+    
+    Args:
+        num_trikes (int): Number of tricycles to simulate
+        use_smart_scheduler (bool): Whether to use smart scheduling or FIFO
+        trike_capacity (int): Capacity of each tricycle
+        seed (str): Seed string for reproducibility
+        max_retries (int): Maximum number of retries for failed simulations
+        max_wait_time (int): Maximum wait time between retries in seconds
+        s_enqueue_radius_meters (float): Radius for enqueueing when tricycle is serving passengers
+        enqueue_radius_meters (float): Radius for enqueueing when tricycle is not serving passengers
+        maxCycles (int): Maximum number of cycles before generating new path
+    Returns:
+        dict: Simulation results or None if all retries failed
+    """
     attempt = 0
     total_wait_time = 0
     last_error = None
+    wait_time = RETRY_BASE_WAIT
     
     while attempt < max_retries:
         try:
-            # Create simulator instance
-            simulator = Simulator(**params)
+            simulator = get_simulator(num_trikes, use_smart_scheduler, trike_capacity, s_enqueue_radius_meters, enqueue_radius_meters, maxCycles)
             
             # Run simulation
             print(f"\nRunning simulation with {num_trikes} tricycles (capacity: {trike_capacity}, s_radius: {s_enqueue_radius_meters}, e_radius: {enqueue_radius_meters}, maxCycles: {maxCycles}, seed: {seed}, attempt: {attempt + 1}/{max_retries})")
-            start_time = time.time()
+            start_time = time.perf_counter()
             
             results = simulator.run(seed=seed, maxTime=15000, fixedHotspots=config.MAGIN_HOTSPOTS, fixedTerminals=config.MAGIN_TERMINALS)
-            end_time = time.time()
+            end_time = time.perf_counter()
+
+            # pool workers skip exit handlers, so the OSRM answers this run added are
+            # saved here for the other workers and later sweeps, and the ones the
+            # other workers saved are picked up for this worker's next run
+            util.save_osrm_cache()
             
             # Add execution time and metadata to results
             results['execution_time_seconds'] = end_time - start_time
@@ -107,26 +207,27 @@ def run_simulation(num_trikes, use_smart_scheduler=True, trike_capacity=3, seed=
             last_error = e
             print(f"Error running simulation (attempt {attempt + 1}/{max_retries}): {str(e)}")
             
-            # Calculate wait time with exponential backoff
-            wait_time = min(5 * (2 ** attempt), max_wait_time)  # Start with 5s, double each time, but cap at max_wait_time
-            total_wait_time += wait_time
-            
-            if "OSRM" in str(e):
-                print(f"OSRM server error detected, waiting {wait_time} seconds before retry...")
-                time.sleep(wait_time)
+            if "OSRM" in str(e) or not util.is_osrm_up():
+                # instead of backing off blindly, retry as soon as OSRM answers again
+                print(f"OSRM server error detected, waiting up to {max_wait_time} seconds for it to respond...")
+                wait_start = time.perf_counter()
+                if not util.wait_for_osrm(max_wait_time):
+                    print("OSRM is still not responding")
+                total_wait_time += time.perf_counter() - wait_start
             else:
-                # For non-OSRM errors, wait a shorter time
-                wait_time = min(wait_time / 2, 30)  # Cap at 30 seconds for non-OSRM errors
-                print(f"Error detected, waiting {wait_time} seconds before retry...")
+                # For non-OSRM errors, back off with decorrelated jitter: each wait is drawn
+                # between the base and three times the last one, capped, so workers that
+                # failed together do not all retry at the same moment
+                wait_time = min(RETRY_MAX_WAIT, random.uniform(RETRY_BASE_WAIT, wait_time * 3))
+                total_wait_time += wait_time
+                print(f"Error detected, waiting {wait_time:.1f} seconds before retry...")
                 time.sleep(wait_time)
             
             attempt += 1
             continue
     
-    print("All retry attempts failed")
-    print("Last error:", str(last_error))
-    print("Full error traceback:")
-    print(traceback.format_exc())
+    # one print, so the lines of the report are not interleaved with other workers' output
+    print(f"All retry attempts failed\nLast error: {last_error}\nFull error traceback:\n{traceback.format_exc()}")
     return None
 
 def print_progress(group_a_completed, group_b_completed, group_c_completed, group_d_completed, 
@@ -168,132 +269,77 @@ def main():
     )
     
     # Try to load existing progress
-    all_results = load_progress(data_dir)
-    if all_results is None:
-        all_results = {
-            'timestamp': datetime.now().isoformat(),
-            'simulations': []
-        }
-    
+    completed_seeds = load_progress(data_dir)
+
     # Initialize progress counters
-    completed_simulations = len(all_results['simulations'])
-    group_a_completed = sum(1 for sim in all_results['simulations'] if sim['metadata'].get('seed', '').startswith('groupA_'))
-    group_b_completed = sum(1 for sim in all_results['simulations'] if sim['metadata'].get('seed', '').startswith('groupB_'))
-    group_c_completed = sum(1 for sim in all_results['simulations'] if sim['metadata'].get('seed', '').startswith('groupC_'))
-    group_d_completed = sum(1 for sim in all_results['simulations'] if sim['metadata'].get('seed', '').startswith('groupD_'))
+    completed_simulations = len(completed_seeds)
+    # seeds start with their group, e.g. groupA_3_0
+    group_completed = Counter(seed.split('_', 1)[0] for seed in completed_seeds)
 
     def update_progress():
-        print_progress(group_a_completed, group_b_completed, group_c_completed, group_d_completed,
+        print_progress(group_completed['groupA'], group_completed['groupB'], group_completed['groupC'], group_completed['groupD'],
                       completed_simulations, total_simulations, tricycle_counts, tricycle_capacities,
                       enqueue_radii, s_enqueue_radii)
 
-    # Group A: Number of tricycles analysis
-    print("\n=== Running Group A: Number of Tricycles Analysis ===")
-    for num_trikes in tricycle_counts:
-        for run in range(NUM_RUNS):
-            seed = f"groupA_{num_trikes}_{run}"
-            print(f"\nTesting Group A - Number of Tricycles: {num_trikes}")
-            print(f"Fixed parameters: capacity=3, s_radius=50, e_radius=100, maxCycles=2")
-            results = run_simulation(
-                num_trikes,
-                use_smart_scheduler=True,
-                trike_capacity=3,
-                seed=seed,
-                s_enqueue_radius_meters=50,
-                enqueue_radius_meters=100,
-                maxCycles=2
-            )
-            if results:
-                all_results['simulations'].append(results)
-                save_progress(all_results, data_dir)
-                completed_simulations += 1
-                group_a_completed += 1
-                update_progress()
-
-    # Group B: Tricycle capacity analysis
-    print("\n=== Running Group B: Tricycle Capacity Analysis ===")
-    for capacity in tricycle_capacities:
-        for run in range(NUM_RUNS):
-            seed = f"groupB_{capacity}_{run}"
-            print(f"\nTesting Group B - Tricycle Capacity: {capacity}")
-            print(f"Fixed parameters: trikes=9, s_radius=50, e_radius=100, maxCycles=2")
-            results = run_simulation(
-                9,  # Fixed number of tricycles
-                use_smart_scheduler=True,
-                trike_capacity=capacity,
-                seed=seed,
-                s_enqueue_radius_meters=50,
-                enqueue_radius_meters=100,
-                maxCycles=2
-            )
-            if results:
-                all_results['simulations'].append(results)
-                save_progress(all_results, data_dir)
-                completed_simulations += 1
-                group_b_completed += 1
-                update_progress()
+    # Every simulation is independent, so all of them are listed up front and spread over
+    # a process pool. Each group varies one parameter; this table holds the value it
+    # varies and the full settings of each of its configurations
+    configs = (
+        [('groupA', num_trikes, dict(num_trikes=num_trikes, trike_capacity=3, s_enqueue_radius_meters=50, enqueue_radius_meters=100))
+         for num_trikes in tricycle_counts] +
+        [('groupB', capacity, dict(num_trikes=9, trike_capacity=capacity, s_enqueue_radius_meters=50, enqueue_radius_meters=100))
+         for capacity in tricycle_capacities] +
+        [('groupC', radius, dict(num_trikes=9, trike_capacity=3, s_enqueue_radius_meters=50, enqueue_radius_meters=radius))
+         for radius in enqueue_radii] +
+        [('groupD', radius, dict(num_trikes=9, trike_capacity=3, s_enqueue_radius_meters=radius, enqueue_radius_meters=100))
+         for radius in s_enqueue_radii]
+    )
+    # seeds that already have results in the progress file are skipped
+    jobs = [
+        dict(params, seed=f"{group}_{value}_{run}")
+        for (group, value, params), run in itertools.product(configs, range(NUM_RUNS))
+        if f"{group}_{value}_{run}" not in completed_seeds
+    ]
 
-    # Group C: Enqueue radius analysis
-    print("\n=== Running Group C: Enqueue Radius Analysis ===")
-    for radius in enqueue_radii:
-        for run in range(NUM_RUNS):
-            seed = f"groupC_{radius}_{run}"
-            print(f"\nTesting Group C - Enqueue Radius: {radius} meters")
-            print(f"Fixed parameters: trikes=9, capacity=3, s_radius=50, maxCycles=2")
-            results = run_simulation(
-                9,  # Fixed number of tricycles
-                use_smart_scheduler=True,
-                trike_capacity=3,
-                seed=seed,
-                s_enqueue_radius_meters=50,
-                enqueue_radius_meters=radius,
-                maxCycles=2
-            )
-            if results:
-                all_results['simulations'].append(results)
-                save_progress(all_results, data_dir)
-                completed_simulations += 1
-                group_c_completed += 1
-                update_progress()
+    if jobs:
+        print("\nFetching the routes between the fixed hotspots...")
+        try:
+            prewarm_osrm_cache(config.MAGIN_HOTSPOTS)
+        except Exception as e:
+            # the runs ask for whatever is missing themselves
+            print(f"Could not prefetch the routes: {e}")
 
-    # Group D: Serving enqueue radius analysis
-    print("\n=== Running Group D: Serving Enqueue Radius Analysis ===")
-    for radius in s_enqueue_radii:
-        for run in range(NUM_RUNS):
-            seed = f"groupD_{radius}_{run}"
-            print(f"\nTesting Group D - Serving Enqueue Radius: {radius} meters")
-            print(f"Fixed parameters: trikes=9, capacity=3, e_radius=100, maxCycles=2")
-            results = run_simulation(
-                9,  # Fixed number of tricycles
-                use_smart_scheduler=True,
-                trike_capacity=3,
-                seed=seed,
-                s_enqueue_radius_meters=radius,
-                enqueue_radius_meters=100,
-                maxCycles=2
-            )
-            if results:
-                all_results['simulations'].append(results)
-                save_progress(all_results, data_dir)
-                completed_simulations += 1
-                group_d_completed += 1
-                update_progress()
+    print(f"\n=== Running {len(jobs)} simulations on {NUM_WORKERS} workers ===")
+    # workers are reseeded from the OS on start, so forked workers do not share the
+    # random state that run ids are drawn from before each run's own seed is applied
+    with ProcessPoolExecutor(max_workers=NUM_WORKERS, initializer=random.seed) as executor:
+        futures = [
+            executor.submit(run_simulation, use_smart_scheduler=True, maxCycles=2, **job)
+            for job in jobs
+        ]
+        for future in as_completed(futures):
+            results = future.result()
+            if not results:
+                continue
+            save_progress(results, data_dir)
+            completed_simulations += 1
+            group_completed[results['metadata']['seed'].split('_', 1)[0]] += 1
+            update_progress()
 
     # Save final results
     final_file = os.path.join(data_dir, f'simulation_results_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json')
-    with open(final_file, 'w') as f:
-        json.dump(all_results, f, indent=2)
+    write_results(data_dir, final_file)
     
     # Clean up progress file
-    progress_file = os.path.join(data_dir, 'simulation_progress.json')
+    progress_file = os.path.join(data_dir, 'simulation_progress.jsonl')
     if os.path.exists(progress_file):
         os.remove(progress_file)
 
     print(f"\nFinal Progress Summary:")
-    print(f"Group A: {group_a_completed}/{len(tricycle_counts) * NUM_RUNS} simulations completed")
-    print(f"Group B: {group_b_completed}/{len(tricycle_capacities) * NUM_RUNS} simulations completed")
-    print(f"Group C: {group_c_completed}/{len(enqueue_radii) * NUM_RUNS} simulations completed")
-    print(f"Group D: {group_d_completed}/{len(s_enqueue_radii) * NUM_RUNS} simulations completed")
+    print(f"Group A: {group_completed['groupA']}/{len(tricycle_counts) * NUM_RUNS} simulations completed")
+    print(f"Group B: {group_completed['groupB']}/{len(tricycle_capacities) * NUM_RUNS} simulations completed")
+    print(f"Group C: {group_completed['groupC']}/{len(enqueue_radii) * NUM_RUNS} simulations completed")
+    print(f"Group D: {group_completed['groupD']}/{len(s_enqueue_radii) * NUM_RUNS} simulations completed")
     print(f"Total simulations completed: {completed_simulations}/{total_simulations} ({(completed_simulations/total_simulations)*100:.1f}%)")
     print(f"Final results saved to: {final_file}")
 
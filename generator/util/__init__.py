@@ -1,12 +1,157 @@
+import os
 import math
+import time
+import atexit
+import pickle
 import random
+import numpy as np
 import requests
 import polyline
-from config import OSRM_URL
+try:
+    import orjson
+except ImportError:
+    orjson = None
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import OSRM_URL, TOP_LEFT_X, TOP_LEFT_Y
 
 class NoRoute(Exception):
     pass
 
+# OSRM answers are cached in memory and on disk, since setup and scheduling ask for
+# the same snaps and routes over and over. The keys are the exact coordinates asked
+# for, so a cached answer is always the one OSRM would give and runs stay
+# reproducible. Delete the cache file whenever the map loaded into OSRM changes.
+OSRM_CACHE_PATH = os.path.join('data', 'osrm_cache.pkl')
+OSRM_CACHE_SIZE = 200_000
+
+osrm_cache = None
+osrm_cache_dirty = False
+# modification time of the cache file when this process last read or wrote it
+osrm_cache_mtime = None
+
+def load_osrm_cache_file():
+    "Returns the OSRM cache saved at OSRM_CACHE_PATH, or None if there is no usable one"
+    try:
+        with open(OSRM_CACHE_PATH, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+
+def get_osrm_cache_file_mtime():
+    "Returns the modification time of the file at OSRM_CACHE_PATH, or None if there is none"
+    try:
+        return os.stat(OSRM_CACHE_PATH).st_mtime_ns
+    except OSError:
+        return None
+
+def get_osrm_cache():
+    """
+    Returns the OSRM cache, loading it from OSRM_CACHE_PATH on first use. It holds a
+    'nearest' dict of (x, y) -> snapped point and a 'route' dict of (x1, y1, x2, y2) ->
+    path, where a path of None means OSRM found no route.
+    """
+    global osrm_cache, osrm_cache_mtime
+    if osrm_cache is None:
+        osrm_cache_mtime = get_osrm_cache_file_mtime()
+        osrm_cache = load_osrm_cache_file() or {"nearest": {}, "route": {}}
+        atexit.register(save_osrm_cache)
+    return osrm_cache
+
+def save_osrm_cache():
+    """
+    Syncs the OSRM cache with OSRM_CACHE_PATH. Entries another process saved since this
+    one last looked are merged into memory, so parallel workers pick up each other's
+    answers, and new entries of this process are written back, replacing the file
+    atomically. Two saves at the same moment can still drop some of each other's
+    entries; they are only cached answers, so they are simply asked from OSRM again.
+
+    This runs at exit, but worker processes of a process pool skip exit handlers,
+    so code running simulations in a pool should call it after each run.
+    """
+    global osrm_cache_dirty, osrm_cache_mtime
+    if osrm_cache is None:
+        return
+    mtime = get_osrm_cache_file_mtime()
+    if mtime != osrm_cache_mtime:
+        saved = load_osrm_cache_file()
+        if saved is not None:
+            for name, table in saved.items():
+                merged = osrm_cache.setdefault(name, {})
+                for key, value in table.items():
+                    if key not in merged and len(merged) < OSRM_CACHE_SIZE:
+                        merged[key] = value
+        osrm_cache_mtime = mtime
+    if not osrm_cache_dirty:
+        return
+    os.makedirs(os.path.dirname(OSRM_CACHE_PATH), exist_ok=True)
+    tmp_path = f'{OSRM_CACHE_PATH}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(osrm_cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, OSRM_CACHE_PATH)
+    osrm_cache_mtime = get_osrm_cache_file_mtime()
+    osrm_cache_dirty = False
+
+def cache_put(table, key, value):
+    "Stores a value in one of the OSRM cache tables unless it is already full"
+    global osrm_cache_dirty
+    if len(table) < OSRM_CACHE_SIZE:
+        table[key] = value
+        osrm_cache_dirty = True
+
+# (connect, read) timeouts in seconds for OSRM queries, so a stuck server fails the
+# run (and lets the sweep retry it) instead of hanging it
+OSRM_TIMEOUT = (3, 30)
+# Waypoint hints only speed up follow-up queries that pass them back, which these never
+# do, so OSRM is asked to leave the long base64 strings out of its answers
+OSRM_PARAMS = {'generate_hints': 'false'}
+
+osrm_session = None
+osrm_session_pid = None
+
+def get_osrm_session():
+    """
+    Returns a requests session for talking to OSRM, so consecutive queries reuse a
+    kept-alive connection instead of opening a new one each time. A new session is
+    made in each process, since pooled connections must not be shared across a fork.
+    Dropped connections are retried a few times with a short backoff.
+    """
+    global osrm_session, osrm_session_pid
+    if osrm_session is None or osrm_session_pid != os.getpid():
+        osrm_session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=Retry(total=3, backoff_factor=0.1))
+        osrm_session.mount('http://', adapter)
+        osrm_session.mount('https://', adapter)
+        osrm_session_pid = os.getpid()
+    return osrm_session
+
+def parse_osrm_response(response):
+    "Returns the parsed JSON body of an OSRM response, using orjson when it is installed"
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
+def is_osrm_up(timeout=5):
+    "Returns True if OSRM answers a nearest query for a point on the map"
+    try:
+        response = get_osrm_session().get(f'{OSRM_URL}/nearest/v1/driving/{TOP_LEFT_X},{TOP_LEFT_Y}', timeout=timeout)
+        return response.ok and parse_osrm_response(response).get('code') == 'Ok'
+    except (requests.RequestException, ValueError):
+        return False
+
+def wait_for_osrm(max_wait, interval=2):
+    """
+    Blocks until OSRM answers again, checking every `interval` seconds. Returns False
+    if it is still not answering after `max_wait` seconds.
+    """
+    deadline = time.monotonic() + max_wait
+    while not is_osrm_up():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+    return True
+
 def find_nearest_point_in_osrm_path(x, y):
     """
     Returns a tuple containing the coordinates of the NEAREST point on the road.
@@ -17,11 +162,17 @@ def find_nearest_point_in_osrm_path(x, y):
     Return value:
     (x_nearest, y_nearest)
     """
-    response = requests.get(f'{OSRM_URL}/nearest/v1/driving/{x},{y}')
-    data = response.json()
+    table = get_osrm_cache()["nearest"]
+    key = (x, y)
+    if key in table:
+        return table[key]
+
+    response = get_osrm_session().get(f'{OSRM_URL}/nearest/v1/driving/{x},{y}', params=OSRM_PARAMS, timeout=OSRM_TIMEOUT)
+    data = parse_osrm_response(response)
     new_x = data['waypoints'][0]['location'][0]
     new_y = data['waypoints'][0]['location'][1]
 
+    cache_put(table, key, (new_x, new_y))
     return new_x, new_y
 
 def find_path_between_points_in_osrm(p1, p2):
@@ -41,21 +192,71 @@ def find_path_between_points_in_osrm(p1, p2):
     
     x1, y1 = p1
     x2, y2 = p2
+
+    table = get_osrm_cache()["route"]
+    key = (x1, y1, x2, y2)
+    if key in table:
+        if table[key] is None:
+            raise NoRoute
+        # callers are free to modify the path they get back
+        return list(table[key])
     
     # First find the nearest points on the road network
     x1, y1 = find_nearest_point_in_osrm_path(x1, y1)
     x2, y2 = find_nearest_point_in_osrm_path(x2, y2)
     
-    response = requests.get(f'{OSRM_URL}/route/v1/driving/{x1},{y1};{x2},{y2}')
-    data = response.json()
+    response = get_osrm_session().get(f'{OSRM_URL}/route/v1/driving/{x1},{y1};{x2},{y2}', params=OSRM_PARAMS, timeout=OSRM_TIMEOUT)
+    data = parse_osrm_response(response)
     
     if data['code'] == "NoRoute":
+        cache_put(table, key, None)
         raise NoRoute
     else:
         routes = polyline.decode(data['routes'][0]['geometry'])
         path = [(x, y) for y,x in routes]
+        cache_put(table, key, tuple(path))
         return path
 
+def prefetch_paths_in_osrm(pairs, max_workers=8):
+    """
+    Asks OSRM for the paths between several pairs of points over concurrent requests,
+    so that the find_path_between_points_in_osrm calls that follow are answered from
+    the cache instead of waiting on one request after another. Pairs that are already
+    cached are skipped, and errors are left for those later calls to raise.
+
+    Parameters:
+    pairs - list of (p1, p2) pairs of (x, y) tuples
+    """
+    table = get_osrm_cache()["route"]
+    missing = [(p1, p2) for p1, p2 in pairs if (*p1, *p2) not in table]
+    if len(missing) < 2:
+        return
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(find_path_between_points_in_osrm, p1, p2) for p1, p2 in missing]
+        for future in futures:
+            future.exception()
+
+def find_distance_table_in_osrm(points):
+    """
+    Returns the road distances between every pair of points with a single OSRM table
+    request, instead of one route request (plus snapping) per pair. The points are
+    snapped to the road network by OSRM itself.
+
+    Parameters:
+    points - list of (x, y) tuples describing the coordinates
+
+    Return value:
+    distances - n x n array where distances[i][j] is the distance in meters from points[i]
+    to points[j], or NaN if there is no route between them
+    """
+    coordinates = ';'.join(f'{x},{y}' for x, y in points)
+    response = get_osrm_session().get(f'{OSRM_URL}/table/v1/driving/{coordinates}', params={**OSRM_PARAMS, 'annotations': 'distance'}, timeout=OSRM_TIMEOUT)
+    data = parse_osrm_response(response)
+
+    if data['code'] != "Ok":
+        raise NoRoute
+    return np.array([[np.nan if d is None else d for d in row] for row in data['distances']], dtype=np.float64)
+
 def get_random(min, max):
     return min + random.random() * (max - min)
 
@@ -80,15 +281,44 @@ def haversine(lon1, lat1, lon2, lat2):
     distance : float
         Distance between the two points in kilometers.
     """
-    # Convert decimal degrees to radians
-    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+    # Convert decimal degrees to radians. This runs for every move of every tricycle,
+    # so it is kept to plain arithmetic on locals, without building lists
+    lat1 = math.radians(lat1)
+    lat2 = math.radians(lat2)
 
     # Haversine formula
     dlat = lat2 - lat1
-    dlon = lon2 - lon1
+    dlon = math.radians(lon2) - math.radians(lon1)
     a = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
     c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
     r = 6371  # Radius of Earth in kilometers. Use 3956 for miles.
     distance = r * c
 
-    return distance * 1000
\ No newline at end of file
+    return distance * 1000
+
+def haversine_to_points(lon, lat, lons, lats):
+    """
+    Calculate the great-circle distance from one point to each of many points in a
+    single vectorized pass, using the same formula as haversine.
+
+    Parameters:
+    lon, lat : float
+        Longitude and latitude of the point in decimal degrees.
+    lons, lats : sequence of float
+        Longitudes and latitudes of the other points in decimal degrees.
+
+    Returns:
+    distances : np.ndarray
+        Distance to each of the other points in meters.
+    """
+    lon1, lat1 = math.radians(lon), math.radians(lat)
+    lon2 = np.radians(np.asarray(lons, dtype=np.float64))
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    r = 6371  # Radius of Earth in kilometers.
+
+    return r * c * 1000